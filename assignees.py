@@ -1,40 +1,54 @@
 #!./.venv/bin/python
 import argparse
-import json
-import random
+import hashlib
+import os
 import re
-import datetime
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
+from bin import client, settings, trace, webhooks
+from bin.fixtures import Recorder, Replayer
+from bin.gh.cache import DEFAULT_CACHE_FILE as GH_CACHE_FILE, ResponseCache
+from bin.gh.prs import (add_reviewer, get_ready_prs_by_authors, get_pr_approvers_and_past_reviewers, get_pr_reviewers,
+                        get_ready_prs_with_reviews, search_ready_prs_by_authors, clear_memo)
+from bin.jira.cache import DEFAULT_CACHE_FILE as TRANSITION_CACHE_FILE, TransitionCache
+from bin.ledger import DEFAULT_LEDGER_FILE, PRLedger
+from bin.load import BARRIER_GRACE, BARRIER_TIMEOUT, DEFAULT_LOAD_FILE, ReviewerLoad
+from bin.jira.tickets import (get_ticket_status, get_ticket_age_in_current_status, transition_ticket_to_in_progress,
+                              get_tickets_status_and_age, transition_tickets, QA_REVIEW)
+from bin.plan import ASSIGN, TRANSITION, Action, apply_plan, deduplicate, print_plan
+from bin.records import PR, TicketState
+from bin.reviewers import ReviewerPool
+from bin.runs import DEFAULT_LOCK_FILE, Checkpoint, Deadline, RunLock
 
-from bin.gh.prs import add_reviewer, get_ready_prs_by_authors, get_pr_approvers_and_past_reviewers, get_pr_reviewers
-from bin.jira.tickets import (get_ticket_status, transition_ticket_to_qa_review, get_ticket_age_in_current_status,
-                              transition_ticket_to_in_progress)
 
+# Global debug flag
+DEBUG_MODE = False
 
-def load_config(config_file="config.json"):
-    try:
-        with open(config_file, "r") as file:
-            return json.load(file)
-    except FileNotFoundError:
-        print(f"Error: Config file '{config_file}' not found.")
-        exit(1)
-    except Exception as e:
-        print(f"Error: Unable to read the config file. Details: {e}")
-        exit(1)
+# Number of PRs fetched in parallel by default
+DEFAULT_CONCURRENCY = 8
 
+# Optional bin.ledger.PRLedger, to repeat the last decision for PRs that did not change since the last run
+LEDGER = None
 
-CONFIG = load_config()
-AUTHORS_FILE = CONFIG["authors_file"]
-ORG = CONFIG["github"]["org"]
-REPO = CONFIG["github"]["repo"]
-GH_TOKEN_FILE = CONFIG["github"]["token_file"]
-JIRA_BASE_URL = CONFIG["jira"]["base_url"]
-JIRA_EMAIL = CONFIG["jira"]["email"]
-JIRA_TOKEN_FILE = CONFIG["jira"]["token_file"]
-JIRA_TICKET_NUMBER_RE = CONFIG["jira"]["ticket_number_regex"]
+# Optional bin.load.ReviewerLoad, the reviewer load shared by the processes of a sharded run (--shard)
+REVIEWER_LOAD = None
 
+# Optional bin.runs.Deadline, after which no more PRs are taken on (--deadline)
+DEADLINE = None
 
-# Global debug flag
-DEBUG_MODE = False
+# Optional bin.runs.Checkpoint of the PRs processed in the current cycle, skipped until every PR is (--checkpoint)
+CHECKPOINT = None
+
+# Decisions recorded in the ledger. Decisions leading to a write are not recorded, the next run decides again.
+DECIDED_NOTHING = "nothing"
+DECIDED_IN_PROGRESS = "in progress"
+DECIDED_MERGE = "merge"
+DECIDED_REVIEWER = "reviewer"
 
 
 def debug_print(*args, **kwargs):
@@ -43,66 +57,72 @@ def debug_print(*args, **kwargs):
         print("DEBUG:", *args, **kwargs)
 
 
-def _project_first(tuples):
-    return [t[0] for t in tuples]
+def _logins(records):
+    return [record.login for record in records]
 
 
-def load_authors(file_path):
-    try:
-        with open(file_path, "r") as file:
-            slack_users_by_gh_users_dict = {}
-            for line in file.readlines():
-                gh_user, slack_user = line.strip().split(":")
-                gh_user = gh_user.lower()
-                slack_users_by_gh_users_dict[gh_user] = slack_user
-            return slack_users_by_gh_users_dict
-    except FileNotFoundError:
-        print(f"Error: Authors file '{file_path}' not found. Please create the file with your desired authors.")
-        exit(1)
-    except Exception as e:
-        print(f"Error: Unable to read the authors file. Details: {e}")
-        exit(1)
+def _get_teammates(teams):
+    """Map every GitHub user to the users of all the teams they are in, who review their PRs."""
+    teammates = {}
+    for team in teams:
+        for user in team:
+            teammates.setdefault(user, set()).update(team)
+    return {user: frozenset(users) for user, users in teammates.items()}
 
 
-def load_token(file_path):
-    try:
-        with open(file_path, "r") as file:
-            return file.read().strip()
-    except FileNotFoundError:
-        print(f"Error: Token file '{file_path}' not found. Please create the file with your GitHub token.")
-        exit(1)
-    except Exception as e:
-        print(f"Error: Unable to read the token file. Details: {e}")
-        exit(1)
+def _get_pr_title(pr):
+    return pr.title.split("|")[0].strip()
 
 
-GH_TOKEN = load_token(GH_TOKEN_FILE)
-JIRA_TOKEN = load_token(JIRA_TOKEN_FILE)
+def _get_ticket_number(pr_title):
+    if re.match(settings.get_jira().ticket_number_regex, pr_title):
+        return pr_title.split()[0]
+    return None
 
 
-def _get_ticket_number_and_status(pr_title):
-    if re.match(JIRA_TICKET_NUMBER_RE, pr_title):
-        ticket_number = pr_title.split()[0]
-        ticket_status = get_ticket_status(JIRA_BASE_URL, JIRA_EMAIL, ticket_number, JIRA_TOKEN)
+def _get_ticket_number_and_status(pr_title, tickets=None):
+    ticket_number = _get_ticket_number(pr_title)
+    if ticket_number:
+        if tickets and ticket_number in tickets:
+            ticket_status = tickets[ticket_number].status
+        else:
+            jira = settings.get_jira()
+            ticket_status = get_ticket_status(jira.base_url, jira.email, ticket_number, jira.token)
         return ticket_number, ticket_status.lower()
     return None, None
 
 
-def _handle_approved_pr(pr_number, pr_url, pr_title, ticket_number, pr_author, ticket_status, approvals, gh_users):
+def _get_ticket_age(ticket_number, tickets=None):
+    if tickets and ticket_number in tickets:
+        return tickets[ticket_number].days_in_status
+    jira = settings.get_jira()
+    return get_ticket_age_in_current_status(jira.base_url, jira.email, ticket_number, jira.token)
+
+
+def _prefetch_tickets(prs):
+    """Look up the status and status age of the tickets of every (org, repo, pr) with a few bulk JIRA searches."""
+    ticket_numbers = {_get_ticket_number(_get_pr_title(pr)) for _, _, pr in prs} - {None}
+    if not ticket_numbers:
+        return {}
+    jira = settings.get_jira()
+    return get_tickets_status_and_age(jira.base_url, jira.email, ticket_numbers, jira.token)
+
+
+def _handle_approved_pr(pr_key, pr_url, pr_title, ticket_number, pr_author, ticket_status, approvals, gh_users, plan):
+    pr_number = pr_key[2]
     if approvals and any(user in gh_users for user in approvals) and ticket_status:
         if ticket_status == "code review":
             _print_pr_info(pr_number, pr_title, pr_author, ticket_status, pr_url)
-            transition_ticket_to_qa_review(JIRA_BASE_URL, JIRA_EMAIL, ticket_number, JIRA_TOKEN)
-            print("  -> Ticket moved to QA")
+            plan.append(Action(TRANSITION, pr_key, ticket=ticket_number, target=QA_REVIEW))
+            print("  -> Moving ticket to QA")
         elif ticket_status == "in review":
             _print_pr_info(pr_number, pr_title, pr_author, ticket_status, pr_url)
             print("  -> Please merge the PR")
 
 
-def _handle_assigned_pr(reviewers, gh_users, slack_users_by_gh_users_dict, ticket_number):
+def _handle_assigned_pr(reviewers, gh_users, slack_users_by_gh_users_dict, ticket_age):
     existing_reviewer = next(user for user in reviewers if user in gh_users)
     if existing_reviewer:
-        ticket_age = get_ticket_age_in_current_status(JIRA_BASE_URL, JIRA_EMAIL, ticket_number, JIRA_TOKEN)
         if ticket_age <= 1:
             print(f"  -> PR already assigned to @{slack_users_by_gh_users_dict[existing_reviewer]}")
         else:
@@ -117,40 +137,9 @@ def _print_pr_info(pr_number, pr_title, pr_author, ticket_status, pr_url):
     print(f"  -> LINK: {pr_url}")
 
 
-def _assign_reviewer(pr_number, pr_author, assigned_prs_per_user, next_assignee_pr_count, slack_users_by_gh_users_dict):
-    possible_assignees = []
-    while not possible_assignees and next_assignee_pr_count < 10:
-        for user, count in assigned_prs_per_user.items():
-            if count <= next_assignee_pr_count and user != pr_author:
-                possible_assignees.append(user)
-        if not possible_assignees:
-            next_assignee_pr_count += 1
-    reviewer = None
-    if possible_assignees:
-        # Group assignees by their PR count
-        assignees_by_count = {}
-        for user in possible_assignees:
-            count = assigned_prs_per_user[user]
-            if count not in assignees_by_count:
-                assignees_by_count[count] = []
-            assignees_by_count[count].append(user)
-
-        # Get assignees with the lowest PR count
-        min_count = min(assignees_by_count.keys())
-        min_count_assignees = assignees_by_count[min_count]
-
-        # If there's only one assignee with the lowest count, choose them
-        # Otherwise randomly select from those with the lowest count
-        if len(min_count_assignees) == 1:
-            reviewer = min_count_assignees[0]
-        else:
-            reviewer = random.choice(min_count_assignees)
-
-    if reviewer:
-        assigned_prs_per_user[reviewer] = assigned_prs_per_user.get(reviewer, 0) + 1
-        print(f"  -> Assigning to @{slack_users_by_gh_users_dict[reviewer]} for review")
-        add_reviewer(ORG, REPO, pr_number, reviewer, GH_TOKEN)
-    return next_assignee_pr_count
+def _assign_reviewer(org, repo, pr_number, reviewer, slack_users_by_gh_users_dict, plan):
+    print(f"  -> Assigning to @{slack_users_by_gh_users_dict[reviewer]} for review")
+    plan.append(Action(ASSIGN, (org, repo, pr_number), reviewer=reviewer))
 
 
 def _is_ready_for_review(ticket_status):
@@ -167,16 +156,67 @@ def _assigned_to_us(reviewers, gh_users):
     return reviewers and any(user in gh_users for user in reviewers)
 
 
-def _assign_prs(to_assign, assigned_prs_per_user, slack_users_by_gh_users_dict):
-    next_assignee_pr_count = 0
-    for pr_number, pr_data in to_assign.items():
-        pr_author = pr_data[0]
-        pr_url = pr_data[1]
-        pr_title = pr_data[2]
-        ticket_status = pr_data[3]
-        _print_pr_info(pr_number, pr_title, pr_author, ticket_status, pr_url)
-        next_assignee_pr_count = _assign_reviewer(pr_number, pr_author, assigned_prs_per_user, next_assignee_pr_count,
-                                                  slack_users_by_gh_users_dict)
+def _count_reviewer(assigned_prs_per_user, reviewer):
+    """Count one more PR for a reviewer, in the REVIEWER_LOAD shared with the other shards too."""
+    assigned_prs_per_user[reviewer] = assigned_prs_per_user.get(reviewer, 0) + 1
+    if REVIEWER_LOAD:
+        REVIEWER_LOAD.add(reviewer)
+
+
+def _pick_shared_reviewers(to_assign, assigned_prs_per_user, teammates):
+    """
+    Pick the reviewers of a shard from the REVIEWER_LOAD, once every shard counted the reviewers of its PRs.
+
+    Returns:
+        dict: The reviewer picked, or None, by PR key, or None if some shards did not count their reviewers in time,
+            in which case no reviewer is picked, since picks would not see the load of those shards.
+    """
+    timeout = max(min(BARRIER_TIMEOUT, DEADLINE.remaining()), BARRIER_GRACE) if DEADLINE else BARRIER_TIMEOUT
+    if to_assign and not REVIEWER_LOAD.wait_for_shards(timeout):
+        print(f"Warning: some shards did not count their reviewers in time, {len(to_assign)} "
+              f"PR{'s' if len(to_assign) != 1 else ''} needing a reviewer {'are' if len(to_assign) != 1 else 'is'} "
+              "left for the next run")
+        return None
+    picked_reviewers = {}
+    for pr_key, pr_data in to_assign.items():
+        reviewer = REVIEWER_LOAD.pick(exclude=pr_data[0], users=teammates[pr_data[0]])
+        if reviewer:
+            assigned_prs_per_user[reviewer] = assigned_prs_per_user.get(reviewer, 0) + 1
+        picked_reviewers[pr_key] = reviewer
+    return picked_reviewers
+
+
+def _assign_prs(to_assign, assigned_prs_per_user, slack_users_by_gh_users_dict, teammates, plan):
+    """
+    Pick a reviewer for every PR of `to_assign` and add the requests to the plan.
+
+    Returns:
+        tuple: The reviewer picked for each PR that got one, and the set of PRs left for the next run because their
+            reviewers could not be picked.
+    """
+    with trace.span("assign reviewers", "run", prs=len(to_assign)):
+        if REVIEWER_LOAD:
+            picked_reviewers = _pick_shared_reviewers(to_assign, assigned_prs_per_user, teammates)
+            if picked_reviewers is None:
+                return {}, set(to_assign)
+        else:
+            # Pick every reviewer up front, in a single pass over the reviewer heaps
+            reviewer_pool = ReviewerPool(assigned_prs_per_user)
+            picked_reviewers = reviewer_pool.assign_batch(
+                [(pr_key, pr_data[0]) for pr_key, pr_data in to_assign.items()], teammates)
+        reviewer_by_pr = {}
+        for pr_key, pr_data in to_assign.items():
+            org, repo, pr_number = pr_key
+            pr_author = pr_data[0]
+            pr_url = pr_data[1]
+            pr_title = pr_data[2]
+            ticket_status = pr_data[3]
+            _print_pr_info(pr_number, pr_title, pr_author, ticket_status, pr_url)
+            reviewer = picked_reviewers[pr_key]
+            if reviewer:
+                _assign_reviewer(org, repo, pr_number, reviewer, slack_users_by_gh_users_dict, plan)
+                reviewer_by_pr[pr_key] = reviewer
+        return reviewer_by_pr, set()
 
 
 def _get_previously_assigned(pr_author, past_reviewers, gh_users):
@@ -184,108 +224,720 @@ def _get_previously_assigned(pr_author, past_reviewers, gh_users):
     return eligible_previous_reviewers[0] if eligible_previous_reviewers else None
 
 
-def should_move_to_in_progress(changes_requesters, approvals, requested_reviewers, ticket_status, gh_users):
-    if ticket_status == "code review":
-        if changes_requesters:
-            # If all who requested changes are from our team
-            if all(user in gh_users for user in _project_first(changes_requesters)):
-                for change_requester, requested_at in changes_requesters:
-                    approval_after_changes_requested = False
-                    review_assignment_after_changes_requested = False
-                    for approver, approved_at in approvals:
-                        if change_requester == approver:
-                            if approved_at > requested_at:
-                                approval_after_changes_requested = True
-                                break
-                        debug_print("change_req: {}, approver: {}, requested_at: {}, approved at: {}".format(
-                            change_requester, approver, requested_at, approved_at))
-                    for requested_reviewer, review_requested_at in requested_reviewers:
-                        if change_requester == requested_reviewer:
-                            if review_requested_at is not None and \
-                                    datetime.datetime.strptime(review_requested_at, "%Y-%m-%dT%H:%M:%SZ") > datetime.datetime.strptime(requested_at, "%Y-%m-%dT%H:%M:%SZ"):
-                                review_assignment_after_changes_requested = True
-                                break
-                        debug_print("change_req: {}, req_reviewer: {}, requested_at: {}, review_requested_at: {}".format(
-                            change_requester, requested_reviewer, requested_at, review_requested_at))
-                    if not approval_after_changes_requested and not review_assignment_after_changes_requested:
-                        return True
+def should_move_to_in_progress(changes_requesters, requested_reviewers, ticket_status, gh_users):
+    """
+    Tell whether the ticket of a PR in code review goes back to in progress: every user who requested changes is from
+    our team, and one of them neither approved since their latest change request nor was requested a review again.
+
+    Args:
+        changes_requesters (dict): The latest approving or change requesting review of each user who requested
+            changes, by login.
+        requested_reviewers (list): ReviewRequest records of the requested reviewers.
+        ticket_status (str): Lowercase status of the ticket.
+        gh_users (iterable): GitHub usernames of the team.
+    """
+    if ticket_status != "code review" or not changes_requesters:
+        return False
+    # If all who requested changes are from our team
+    if not all(login in gh_users for login in changes_requesters):
+        return False
+    requested_at_by_login = {request.login: request.requested_at for request in requested_reviewers}
+    for login, latest_review in changes_requesters.items():
+        if latest_review.state != "CHANGES_REQUESTED":
+            # Approved since their changes were requested
+            continue
+        requested_at = requested_at_by_login.get(login)
+        debug_print("change_req: {}, requested_at: {}, review_requested_at: {}".format(
+            login, latest_review.submitted_at, requested_at))
+        if requested_at is None or requested_at <= latest_review.submitted_at:
+            return True
     return False
 
 
-def assign_to_previously_assigned(pr_number, reviewer, assigned_prs_per_user, slack_users_by_gh_users_dict):
-    assigned_prs_per_user[reviewer] = assigned_prs_per_user.get(reviewer, 0) + 1
+def assign_to_previously_assigned(org, repo, pr_number, reviewer, assigned_prs_per_user,
+                                  slack_users_by_gh_users_dict, plan):
+    _count_reviewer(assigned_prs_per_user, reviewer)
     print(f"  -> Reassigning to previous reviewer @{slack_users_by_gh_users_dict[reviewer]}")
-    add_reviewer(ORG, REPO, pr_number, reviewer, GH_TOKEN)
+    plan.append(Action(ASSIGN, (org, repo, pr_number), reviewer=reviewer))
 
 
 def _move_to_in_progress(pr_number, pr_title, pr_author, ticket_status, pr_url, ticket_number):
     _print_pr_info(pr_number, pr_title, pr_author, ticket_status, pr_url)
     print("  -> Changes requested, moving ticket to 'In Progress'")
-    # transition_ticket_to_in_progress(JIRA_BASE_URL, JIRA_EMAIL, ticket_number, JIRA_TOKEN)
-
-
-def assign_pending_prs(prs, slack_users_by_gh_users_dict, gh_users):
-    assigned_prs_per_user = {u: 0 for u in gh_users}
-    to_assign = {}
-    for pr in prs:
-        pr_number, pr_url, pr_title = pr["number"], pr["html_url"], pr["title"].split("|")[0].strip()
-        pr_author = pr['user']['login'].lower()
-        ticket_number, ticket_status = _get_ticket_number_and_status(pr_title)
-        if _is_ready_for_review(ticket_status):
-            try:
+    # transition_ticket_to_in_progress(jira.base_url, jira.email, ticket_number, jira.token)
+
+
+def _get_fingerprint(pr, ticket_status, gh_users):
+    """
+    Digest of everything a PR's decision is taken from: its last update and head commit (reviews and review requests
+    update the PR), its ticket status and the team reviewing it. None when the PR's last update is unknown.
+    """
+    if pr.updated_at is None:
+        return None
+    parts = [pr.updated_at.isoformat(), pr.head_sha or "", ticket_status, ",".join(sorted(gh_users))]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def _fetch_pr_data(org, repo, pr, teammates, pr_reviews=None, tickets=None, use_ledger=True):
+    """
+    Fetch everything the assignment decision needs for one PR. Performs no writes.
+    Review data already present in `pr_reviews` (as returned by _fetch_open_prs) and tickets already
+    present in `tickets` (as returned by get_tickets_status_and_age) are not fetched again, and with `use_ledger`
+    nothing is fetched for a PR whose LEDGER entry shows it did not change since the last run.
+    """
+    with trace.span(f"{org}/{repo}#{pr.number}", "pr") as details:
+        pr_number, pr_url, pr_title = pr.number, pr.url, _get_pr_title(pr)
+        pr_author = pr.author
+        gh_users = teammates.get(pr_author, frozenset())
+        ticket_number, ticket_status = _get_ticket_number_and_status(pr_title, tickets)
+        pr_data = {
+            "org": org, "repo": repo, "number": pr_number, "url": pr_url, "title": pr_title, "author": pr_author,
+            "ticket_number": ticket_number, "ticket_status": ticket_status, "ticket_age": None, "error": None,
+            "fingerprint": None, "unchanged": None, "decision": None,
+        }
+        if not _is_ready_for_review(ticket_status):
+            return pr_data
+        pr_data["fingerprint"] = _get_fingerprint(pr, ticket_status, gh_users)
+        entry = None
+        if use_ledger and LEDGER and pr_data["fingerprint"]:
+            entry = LEDGER.get(f"{org}/{repo}", pr_number)
+        if entry and entry.fingerprint == pr_data["fingerprint"]:
+            details["unchanged"] = True
+            pr_data["unchanged"] = entry
+            if entry.decision == DECIDED_REVIEWER:
+                pr_data["ticket_age"] = _get_ticket_age(ticket_number, tickets)
+            return pr_data
+        try:
+            if pr_reviews and (org, repo, pr_number) in pr_reviews:
+                approvals, past_reviewers, changes_requesters, requested_reviewers, reviewers = \
+                    pr_reviews[(org, repo, pr_number)]
+            else:
                 approvals, past_reviewers, changes_requesters, requested_reviewers = \
-                    get_pr_approvers_and_past_reviewers(ORG, REPO, pr_number, GH_TOKEN)
-                reviewers = get_pr_reviewers(ORG, REPO, pr_number, GH_TOKEN)
-            except Exception as e:
-                print(f"Error fetching PR data for #{pr_number}: {e}")
+                    get_pr_approvers_and_past_reviewers(org, repo, pr_number, settings.get_token("github"))
+                reviewers = get_pr_reviewers(org, repo, pr_number, settings.get_token("github"))
+                # Everything needed is extracted, no need to keep the raw PR data around
+                clear_memo(org, repo, pr_number)
+        except Exception as e:
+            pr_data["error"] = e
+            return pr_data
+        pr_data.update({
+            "approvals": approvals, "past_reviewers": past_reviewers, "changes_requesters": changes_requesters,
+            "requested_reviewers": requested_reviewers, "reviewers": reviewers,
+        })
+        # Only PRs that end up reminding their reviewer need the ticket age, fetch it here to keep it concurrent
+        if not should_move_to_in_progress(changes_requesters, requested_reviewers, ticket_status, gh_users) \
+                and not _approved_by_us(_logins(approvals), gh_users) and _assigned_to_us(reviewers, gh_users):
+            pr_data["ticket_age"] = _get_ticket_age(ticket_number, tickets)
+        return pr_data
+
+
+def _fetch_all_pr_data(prs, teammates, concurrency, pr_reviews=None, tickets=None):
+    """
+    Fetch the data of every (org, repo, pr), using up to `concurrency` threads. Results keep the order of `prs`.
+    Once the DEADLINE expires, no more PRs are started and the result of the PRs left is None.
+    """
+    if tickets is None:
+        tickets = _prefetch_tickets(prs)
+
+    def fetch(org, repo, pr):
+        if DEADLINE and DEADLINE.expired():
+            return None
+        return _fetch_pr_data(org, repo, pr, teammates, pr_reviews, tickets)
+
+    if concurrency <= 1:
+        return [fetch(*item) for item in prs]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(lambda item: fetch(*item), prs))
+
+
+def _process_pr(pr_data, assigned_prs_per_user, slack_users_by_gh_users_dict, teammates, plan):
+    """
+    Run the decision logic for one PR whose data was fetched by _fetch_pr_data. Only the teammates of the PR author
+    count as "us". Performs no writes: the reviewer requests and ticket transitions decided are appended to `plan`,
+    for _apply_plan.
+
+    Returns:
+        tuple: The reviewer from our team now counted for the PR (or None), and whether the PR still needs a
+            reviewer to be picked from the ReviewerPool.
+    """
+    pr_number, pr_url, pr_title = pr_data["number"], pr_data["url"], pr_data["title"]
+    pr_author = pr_data["author"]
+    gh_users = teammates.get(pr_author, frozenset())
+    ticket_number, ticket_status = pr_data["ticket_number"], pr_data["ticket_status"]
+    if not _is_ready_for_review(ticket_status):
+        return None, False
+    if pr_data["error"]:
+        print(f"Error fetching PR data for #{pr_number}: {pr_data['error']}")
+        _print_pr_info(pr_number, pr_title, pr_author, ticket_status, pr_url)
+        return None, False
+    if pr_data["unchanged"]:
+        return _repeat_decision(pr_data, assigned_prs_per_user, slack_users_by_gh_users_dict)
+    approvals, past_reviewers = pr_data["approvals"], pr_data["past_reviewers"]
+    changes_requesters, requested_reviewers = pr_data["changes_requesters"], pr_data["requested_reviewers"]
+    reviewers = pr_data["reviewers"]
+    if should_move_to_in_progress(changes_requesters, requested_reviewers, ticket_status, gh_users):
+        _move_to_in_progress(pr_number, pr_title, pr_author, ticket_status, pr_url, ticket_number)
+        pr_data["decision"] = (DECIDED_IN_PROGRESS, None)
+    else:
+        if _approved_by_us(_logins(approvals), gh_users):
+            _handle_approved_pr(_pr_key(pr_data), pr_url, pr_title, ticket_number, pr_author, ticket_status,
+                                _logins(approvals), gh_users, plan)
+            if ticket_status != "code review":
+                pr_data["decision"] = (DECIDED_MERGE if ticket_status == "in review" else DECIDED_NOTHING, None)
+        else:
+            if _assigned_to_us(reviewers, gh_users):
                 _print_pr_info(pr_number, pr_title, pr_author, ticket_status, pr_url)
-                continue
-            if should_move_to_in_progress(changes_requesters, approvals, requested_reviewers, ticket_status, gh_users):
-                _move_to_in_progress(pr_number, pr_title, pr_author, ticket_status, pr_url, ticket_number)
+                reviewer = _handle_assigned_pr(reviewers, gh_users, slack_users_by_gh_users_dict,
+                                               pr_data["ticket_age"])
+                _count_reviewer(assigned_prs_per_user, reviewer)
+                pr_data["decision"] = (DECIDED_REVIEWER, reviewer)
+                return reviewer, False
             else:
-                if _approved_by_us(_project_first(approvals), gh_users):
-                    _handle_approved_pr(pr_number, pr_url, pr_title, ticket_number, pr_author, ticket_status,
-                                        _project_first(approvals), gh_users)
+                old_assignee = _get_previously_assigned(pr_author, _logins(past_reviewers), gh_users)
+                if old_assignee:
+                    _print_pr_info(pr_number, pr_title, pr_author, ticket_status, pr_url)
+                    assign_to_previously_assigned(pr_data["org"], pr_data["repo"], pr_number, old_assignee,
+                                                  assigned_prs_per_user, slack_users_by_gh_users_dict, plan)
+                    return old_assignee, False
                 else:
-                    if _assigned_to_us(reviewers, gh_users):
-                        _print_pr_info(pr_number, pr_title, pr_author, ticket_status, pr_url)
-                        reviewer = _handle_assigned_pr(reviewers, gh_users, slack_users_by_gh_users_dict, ticket_number)
-                        assigned_prs_per_user[reviewer] = assigned_prs_per_user.get(reviewer, 0) + 1
-                    else:
-                        old_assignee = _get_previously_assigned(pr_author, _project_first(past_reviewers), gh_users)
-                        if old_assignee:
-                            _print_pr_info(pr_number, pr_title, pr_author, ticket_status, pr_url)
-                            assign_to_previously_assigned(pr_number, old_assignee, assigned_prs_per_user,
-                                                          slack_users_by_gh_users_dict)
-                        else:
-                            to_assign[pr_number] = (pr_author, pr_url, pr_title, ticket_status)
-    _assign_prs(to_assign, assigned_prs_per_user, slack_users_by_gh_users_dict)
+                    return None, True
+    return None, False
+
+
+def _repeat_decision(pr_data, assigned_prs_per_user, slack_users_by_gh_users_dict):
+    """Repeat, for a PR that did not change since the last run, the decision recorded in the LEDGER."""
+    pr_number, pr_url, pr_title = pr_data["number"], pr_data["url"], pr_data["title"]
+    pr_author, ticket_status = pr_data["author"], pr_data["ticket_status"]
+    decision, reviewer = pr_data["unchanged"].decision, pr_data["unchanged"].reviewer
+    pr_data["decision"] = (decision, reviewer)
+    if decision == DECIDED_IN_PROGRESS:
+        _move_to_in_progress(pr_number, pr_title, pr_author, ticket_status, pr_url, pr_data["ticket_number"])
+    elif decision == DECIDED_MERGE:
+        _print_pr_info(pr_number, pr_title, pr_author, ticket_status, pr_url)
+        print("  -> Please merge the PR")
+    elif decision == DECIDED_REVIEWER:
+        _print_pr_info(pr_number, pr_title, pr_author, ticket_status, pr_url)
+        _handle_assigned_pr([reviewer], {reviewer}, slack_users_by_gh_users_dict, pr_data["ticket_age"])
+        _count_reviewer(assigned_prs_per_user, reviewer)
+        return reviewer, False
+    return None, False
+
+
+def _record_decisions(all_pr_data):
+    """Record in the LEDGER the decision taken for every PR, forgetting the ones that led to a write."""
+    LEDGER.record([
+        (f"{pr_data['org']}/{pr_data['repo']}", pr_data["number"], pr_data["fingerprint"],
+         *(pr_data["decision"] or (None, None)))
+        for pr_data in all_pr_data if pr_data["fingerprint"]
+    ])
+
+
+def _pr_key(pr_data):
+    return pr_data["org"], pr_data["repo"], pr_data["number"]
+
+
+def assign_pending_prs(prs, slack_users_by_gh_users_dict, teammates, concurrency=1, pr_reviews=None, tickets=None,
+                       plan_only=False):
+    """
+    Process every PR and assign reviewers to the ones that need one. The load of each reviewer is counted across all
+    the repositories of `prs`, and across the PRs of every shard of the run when REVIEWER_LOAD is set.
+
+    Runs in two phases: every decision is made first, from the fetched data and without any write, and the resulting
+    plan of reviewer requests and ticket transitions is then applied concurrently.
+
+    With a CHECKPOINT, the PRs already processed in the current cycle are skipped, their reviewers still counted, and
+    the PRs processed, or whose data could not be fetched, are added to it, without a reviewer when one of their
+    actions failed. PRs not started when the DEADLINE expires are left for the next run.
+
+    Args:
+        prs (list): (org, repo, pr) tuples.
+        slack_users_by_gh_users_dict (dict): Slack usernames by GitHub username, for every team.
+        teammates (dict): The users reviewing the PRs of each author, as returned by _get_teammates.
+        concurrency (int): Number of PRs whose data is fetched, and of actions applied, in parallel.
+        pr_reviews (dict): Review data already fetched, by (org, repo, number).
+        tickets (dict): Tickets already fetched, as returned by get_tickets_status_and_age.
+        plan_only (bool): Print the plan instead of applying it.
+
+    Returns:
+        dict: The reviewer from our team counted for each (org, repo, number) that has one.
+    """
+    assigned_prs_per_user = {u: 0 for u in teammates}
+    reviewer_by_pr = {}
+    if CHECKPOINT:
+        processed = CHECKPOINT.start([Checkpoint.key(org, repo, pr.number) for org, repo, pr in prs])
+        if processed:
+            print(f"Resuming: {len(processed)} PR{'s' if len(processed) != 1 else ''} already processed in this cycle")
+        for org, repo, pr in prs:
+            reviewer = processed.get(Checkpoint.key(org, repo, pr.number))
+            if reviewer:
+                _count_reviewer(assigned_prs_per_user, reviewer)
+                reviewer_by_pr[(org, repo, pr.number)] = reviewer
+        prs = [(org, repo, pr) for org, repo, pr in prs if Checkpoint.key(org, repo, pr.number) not in processed]
+    left = 0
+    if DEADLINE and DEADLINE.expired():
+        # Not even the tickets are looked up
+        left, prs = len(prs), []
+    if tickets is None:
+        tickets = _prefetch_tickets(prs)
+    to_assign = {}
+    plan = []
+    all_pr_data = _fetch_all_pr_data(prs, teammates, concurrency, pr_reviews, tickets)
+    left += all_pr_data.count(None)
+    if left:
+        print(f"Deadline reached: {left} PR{'s' if left != 1 else ''} left for the next run")
+        all_pr_data = [pr_data for pr_data in all_pr_data if pr_data is not None]
+    for pr_data in all_pr_data:
+        reviewer, needs_assignment = _process_pr(pr_data, assigned_prs_per_user, slack_users_by_gh_users_dict,
+                                                 teammates, plan)
+        if reviewer:
+            reviewer_by_pr[_pr_key(pr_data)] = reviewer
+        if needs_assignment:
+            to_assign[_pr_key(pr_data)] = (pr_data["author"], pr_data["url"], pr_data["title"],
+                                           pr_data["ticket_status"])
+    if REVIEWER_LOAD:
+        REVIEWER_LOAD.mark_counted()
+    assigned, postponed = _assign_prs(to_assign, assigned_prs_per_user, slack_users_by_gh_users_dict, teammates, plan)
+    reviewer_by_pr.update(assigned)
+    if plan_only:
+        print_plan(plan)
+    else:
+        errors = _apply_plan(plan, tickets, concurrency)
+        if LEDGER:
+            _record_decisions(all_pr_data)
+        if CHECKPOINT:
+            # PRs whose data could not be fetched, or whose actions failed, are recorded too, otherwise a PR failing on
+            # every run would keep the cycle from ever ending; they are recorded without a reviewer, so a reviewer
+            # whose request failed is not counted, and are tried again in the next cycle. PRs whose reviewers could
+            # not be picked are left for the next run.
+            failed_keys = {action.key for action in errors}
+            failed_prs = {action.pr for action in plan if action.key in failed_keys}
+            CHECKPOINT.add({
+                Checkpoint.key(*_pr_key(pr_data)):
+                    None if _pr_key(pr_data) in failed_prs else reviewer_by_pr.get(_pr_key(pr_data))
+                for pr_data in all_pr_data if _pr_key(pr_data) not in postponed
+            })
+    return reviewer_by_pr
+
+
+def _request_reviewers(actions, concurrency):
+    """Apply ASSIGN actions, `concurrency` at a time. Returns the exception raised for each failed action."""
+    gh_token = settings.get_token("github")
+    errors = {}
+
+    def apply(action):
+        org, repo, pr_number = action.pr
+        try:
+            add_reviewer(org, repo, pr_number, action.reviewer, gh_token)
+        except Exception as e:
+            errors[action] = e
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        list(executor.map(apply, actions))
+    return errors
+
+
+def _is_reviewer_requested(action):
+    org, repo, pr_number = action.pr
+    clear_memo(org, repo, pr_number)
+    return action.reviewer in get_pr_reviewers(org, repo, pr_number, settings.get_token("github"))
+
+
+def _transition_tickets(actions, tickets, concurrency):
+    """Apply TRANSITION actions, `concurrency` at a time. Returns the exception raised for each failed action."""
+    jira = settings.get_jira()
+    errors = transition_tickets(jira.base_url, jira.email, [(action.ticket, action.target) for action in actions],
+                                jira.token, tickets, concurrency)
+    return {action: errors[action.ticket] for action in actions if action.ticket in errors}
+
+
+def _is_ticket_transitioned(action):
+    jira = settings.get_jira()
+    return get_ticket_status(jira.base_url, jira.email, action.ticket, jira.token).lower() == action.target
+
+
+def _apply_plan(plan, tickets, concurrency):
+    """
+    Apply the actions decided by _process_pr and _assign_prs, retrying the ones that fail, and print the outcome of
+    each one.
+
+    Returns:
+        dict: The error of each action that could not be applied.
+    """
+    if not plan:
+        return {}
+    errors = apply_plan(
+        plan,
+        appliers={
+            ASSIGN: lambda actions: _request_reviewers(actions, concurrency),
+            TRANSITION: lambda actions: _transition_tickets(actions, tickets, concurrency),
+        },
+        checks={ASSIGN: _is_reviewer_requested, TRANSITION: _is_ticket_transitioned},
+    )
+    print()
+    for action in deduplicate(plan):
+        if action in errors:
+            print(f"Error: could not {action.describe()}: {errors[action]}")
+        else:
+            print(f"Applied: {action.describe()}")
+    return errors
+
+
+def _fetch_open_prs(repos, authors, use_graphql=False, use_search=False):
+    """
+    Fetch the open, non draft PRs of `authors` in every repository, one repository per thread.
+    With `use_search`, only the PRs of `authors` are fetched, through the Search API.
+
+    Returns:
+        tuple: A list of (org, repo, pr) tuples, and with `use_graphql` the review data of the PRs by
+            (org, repo, number), None otherwise.
+    """
+    gh_token = settings.get_token("github")
+    with trace.span("fetch open PRs", "run", repos=len(repos)):
+        def fetch(org_repo):
+            org, repo = org_repo
+            if use_graphql:
+                return get_ready_prs_with_reviews(org, repo, authors, gh_token)
+            if use_search:
+                return search_ready_prs_by_authors(org, repo, authors, gh_token), None
+            return get_ready_prs_by_authors(org, repo, authors, gh_token), None
+
+        with ThreadPoolExecutor(max_workers=len(repos)) as executor:
+            results = list(executor.map(fetch, repos))
+        prs_list = []
+        pr_reviews = {} if use_graphql else None
+        for (org, repo), (repo_prs, repo_pr_reviews) in zip(repos, results):
+            prs_list.extend((org, repo, pr) for pr in repo_prs)
+            for pr_number, reviews in (repo_pr_reviews or {}).items():
+                pr_reviews[(org, repo, pr_number)] = reviews
+        return prs_list, pr_reviews
+
+
+def _is_tracked_pr(pr, teammates):
+    return not pr.draft and pr.state == "open" and pr.author in teammates
+
+
+def _reprocess_pr(state, pr_key, slack_users_by_gh_users_dict, teammates):
+    """Re-run the decision logic for one (org, repo, number) of the in-memory state, after an event changed it."""
+    org, repo, pr_number = pr_key
+    state["reviewer_by_pr"].pop(pr_key, None)
+    pr = state["prs"].get(pr_key)
+    if pr is None:
+        return
+    ticket_number = _get_ticket_number(_get_pr_title(pr))
+    if ticket_number and ticket_number not in state["tickets"]:
+        jira = settings.get_jira()
+        state["tickets"].update(get_tickets_status_and_age(jira.base_url, jira.email, [ticket_number], jira.token))
+    assigned_prs_per_user = {u: 0 for u in teammates}
+    for reviewer in state["reviewer_by_pr"].values():
+        assigned_prs_per_user[reviewer] = assigned_prs_per_user.get(reviewer, 0) + 1
+    # The event may have changed the reviews or review requests fetched earlier
+    clear_memo(org, repo, pr_number)
+    # An event is a change, never repeat the LEDGER decision taken before it
+    pr_data = _fetch_pr_data(org, repo, pr, teammates, tickets=state["tickets"], use_ledger=False)
+    plan = []
+    reviewer, needs_assignment = _process_pr(pr_data, assigned_prs_per_user, slack_users_by_gh_users_dict,
+                                             teammates, plan)
+    if needs_assignment:
+        _print_pr_info(pr_number, pr_data["title"], pr_data["author"], pr_data["ticket_status"], pr_data["url"])
+        reviewer = ReviewerPool(assigned_prs_per_user).pick(exclude=pr_data["author"],
+                                                            users=teammates[pr_data["author"]])
+        if reviewer:
+            _assign_reviewer(org, repo, pr_number, reviewer, slack_users_by_gh_users_dict, plan)
+    _apply_plan(plan, state["tickets"], 1)
+    if reviewer:
+        state["reviewer_by_pr"][pr_key] = reviewer
+
+
+def _handle_webhook_event(state, source, event, payload, slack_users_by_gh_users_dict, teammates):
+    debug_print(f"{source} webhook: {event} {payload.get('action', '')}")
+    if source == "github":
+        repo_name = (payload.get("repository") or {}).get("full_name", "").lower()
+        if not payload.get("pull_request") or repo_name not in state["repos"]:
+            return
+        pr = PR.from_github(payload["pull_request"])
+        pr_key = state["repos"][repo_name] + (pr.number,)
+        if event == "pull_request":
+            if _is_tracked_pr(pr, teammates):
+                state["prs"][pr_key] = pr
+            else:
+                state["prs"].pop(pr_key, None)
+        elif pr_key in state["prs"]:
+            # Other events (reviews...) carry the PR too, keep its record up to date
+            state["prs"][pr_key] = pr
+        _reprocess_pr(state, pr_key, slack_users_by_gh_users_dict, teammates)
+    elif source == "jira":
+        issue = payload.get("issue") or {}
+        status = ((issue.get("fields") or {}).get("status") or {}).get("name")
+        if not issue.get("key") or not status:
+            return
+        status_changed = any(item.get("field") == "status"
+                             for item in (payload.get("changelog") or {}).get("items", []))
+        fields = issue.get("fields") or {}
+        ticket = state["tickets"].get(issue["key"]) or TicketState(
+            issue["key"], status, 0, project=(fields.get("project") or {}).get("key"),
+            issue_type=(fields.get("issuetype") or {}).get("name"))
+        state["tickets"][issue["key"]] = replace(ticket, status=status,
+                                                 days_in_status=0 if status_changed else ticket.days_in_status)
+        for pr_key, pr in sorted(state["prs"].items()):
+            if _get_ticket_number(_get_pr_title(pr)) == issue["key"]:
+                _reprocess_pr(state, pr_key, slack_users_by_gh_users_dict, teammates)
+
+
+def _get_webhook_secrets():
+    """Return the GitHub and JIRA webhook secrets of the config, None for the ones not set."""
+    config = settings.get_config()
+    return (config["github"].get("webhook_secret"), (config.get("jira") or {}).get("webhook_secret"))
+
+
+def serve(port, slack_users_by_gh_users_dict, teammates, concurrency=1, record_dir=None):
+    """
+    Process every open PR of every repository once, then keep an in-memory model of the open PRs, reviewer load and
+    ticket statuses up to date from GitHub and JIRA webhooks, re-running the decision logic only for the PRs an
+    event affects. Deliveries are only checked against the webhook secrets that are set in the config.
+    """
+    repos = settings.get_repos()
+    prs_list, _ = _fetch_open_prs(repos, teammates)
+    tickets = _prefetch_tickets(prs_list)
+    reviewer_by_pr = assign_pending_prs(prs_list, slack_users_by_gh_users_dict, teammates, concurrency,
+                                        tickets=tickets)
+    state = {
+        "repos": {f"{org}/{repo}".lower(): (org, repo) for org, repo in repos},
+        "prs": {(org, repo, pr.number): pr for org, repo, pr in prs_list},
+        "tickets": tickets,
+        "reviewer_by_pr": reviewer_by_pr,
+    }
+    github_secret, jira_secret = _get_webhook_secrets()
+    server = webhooks.create_server(
+        "", port,
+        lambda source, event, payload: _handle_webhook_event(state, source, event, payload,
+                                                             slack_users_by_gh_users_dict, teammates),
+        secret=github_secret, jira_secret=jira_secret, record_dir=record_dir,
+    )
+    print(f"\nListening for GitHub webhooks on :{port}/github and JIRA webhooks on :{port}/jira")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+def _parse_shard(value):
+    """Parse an "I/N" shard, returning (I, N)."""
+    match = re.fullmatch(r"(\d+)/(\d+)", value)
+    if not match or int(match[1]) >= int(match[2]):
+        raise ValueError(f"--shard must be I/N with 0 <= I < N, not '{value}'.")
+    return int(match[1]), int(match[2])
+
+
+def _shard_path(path, shard):
+    """
+    Return the path of a file written by a shard, e.g. `run.1.json` for `run.json` and shard 1, so that shards never
+    write the same file. Unsharded runs use `path` itself.
+    """
+    if not shard:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}.{shard[0]}{extension}"
+
+
+def _run_shards(shards, argv):
+    """
+    Run this script in `shards` processes sharing a reviewer load, each with the same arguments plus its own --shard,
+    and print their output and errors in shard order.
+
+    Returns:
+        int: The exit status, 1 if any shard failed.
+    """
+    run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+    # Every argument but --shards N is passed on
+    shard_argv = []
+    skip = False
+    for arg in argv:
+        if skip or arg.startswith("--shards="):
+            skip = False
+            continue
+        if arg == "--shards":
+            skip = True
+            continue
+        shard_argv.append(arg)
+    processes = []
+    for index in range(shards):
+        output = tempfile.TemporaryFile(mode="w+")
+        errors = tempfile.TemporaryFile(mode="w+")
+        command = [sys.executable, sys.argv[0]] + shard_argv + ["--shard", f"{index}/{shards}", "--run-id", run_id]
+        processes.append((subprocess.Popen(command, stdout=output, stderr=errors), output, errors))
+    status = 0
+    for index, (process, output, errors) in enumerate(processes):
+        if process.wait() != 0:
+            status = 1
+        print(f"\n=== Shard {index}/{shards} ===")
+        for file, stream in ((output, sys.stdout), (errors, sys.stderr)):
+            file.seek(0)
+            print(file.read(), end="", file=stream)
+            file.close()
+        sys.stdout.flush()
+    return status
 
 
 def main():
-    global DEBUG_MODE
 
     # Parse command line arguments
     parser = argparse.ArgumentParser(description='Assign pending pull requests to reviewers.')
     parser.add_argument('--debug', '-d', action='store_true', help='Enable debug output')
+    parser.add_argument('--pool-size', type=int, default=client.POOL_SIZE,
+                        help='Maximum number of keep-alive connections per host')
+    parser.add_argument('--concurrency', '-c', type=int, default=DEFAULT_CONCURRENCY,
+                        help='Number of PRs whose data is fetched in parallel')
+    parser.add_argument('--graphql', action='store_true',
+                        help='Fetch open PRs with their reviews and review requests through the GraphQL API')
+    parser.add_argument('--search', action='store_true',
+                        help='Find the open PRs of the team with the Search API instead of listing every open PR')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Do not use the on-disk GitHub response cache, JIRA transition cache and PR ledger')
+    parser.add_argument('--plan-only', action='store_true',
+                        help='Print the reviewer requests and ticket transitions decided, without applying them')
+    parser.add_argument('--serve', action='store_true',
+                        help='Keep running and process the PRs affected by GitHub and JIRA webhooks')
+    parser.add_argument('--port', type=int, default=8080, help='Port to listen on for webhooks with --serve')
+    parser.add_argument('--insecure', action='store_true',
+                        help='Let --serve accept webhooks without github.webhook_secret or jira.webhook_secret set, '
+                             'from anyone who can reach the port')
+    parser.add_argument('--record-webhooks', type=str, default=None, metavar='DIR',
+                        help='Save every webhook received with --serve to DIR, for later replay')
+    parser.add_argument('--record-http', type=str, default=None, metavar='FILE',
+                        help='Record every GitHub and JIRA request and response to FILE')
+    parser.add_argument('--replay-http', type=str, default=None, metavar='FILE',
+                        help='Answer GitHub and JIRA requests from a FILE written by --record-http, offline')
+    parser.add_argument('--trace', type=str, default=None, metavar='FILE',
+                        help='Write a trace of every PR and HTTP call to FILE (JSON lines if it ends with .jsonl, '
+                             'Chrome trace format otherwise) and print the slowest PRs and endpoints')
+    parser.add_argument('--shards', type=int, default=None, metavar='N',
+                        help='Process the PRs in N local processes, partitioned by PR number')
+    parser.add_argument('--shard', type=str, default=None, metavar='I/N',
+                        help='Only process the PRs whose number modulo N is I, sharing the reviewer load with the '
+                             'other shards of the same --run-id')
+    parser.add_argument('--run-id', type=str, default=None,
+                        help='Identifier shared by every shard of a run, e.g. the time the run was scheduled at')
+    parser.add_argument('--load-file', type=str, default=DEFAULT_LOAD_FILE, metavar='FILE',
+                        help='SQLite file holding the reviewer load shared by the shards of a run')
+    parser.add_argument('--deadline', type=float, default=None, metavar='SECONDS',
+                        help='Stop taking on new PRs after SECONDS, leaving them for the next run. The reviewer '
+                             'requests and ticket transitions decided for the PRs taken on are still applied, that '
+                             'phase is not bounded')
+    parser.add_argument('--checkpoint', type=str, default=None, metavar='FILE',
+                        help='Record the PRs processed in FILE, and skip them until every open PR has been processed')
+    parser.add_argument('--lock-file', type=str, default=DEFAULT_LOCK_FILE, metavar='FILE',
+                        help='File locked for the whole run, so that a run does not start while another one is going')
     args = parser.parse_args()
+    deadline = Deadline(args.deadline) if args.deadline is not None else None
+    try:
+        teams = [slack_users_by_gh_users_dict for _, slack_users_by_gh_users_dict in settings.load_teams()]
+        # Fail now rather than in the middle of the run
+        settings.get_token("github")
+        settings.get_jira()
+    except settings.SettingsError as e:
+        print(f"Error: {e}")
+        exit(1)
+    shard = None
+    try:
+        if args.serve and (args.shard or args.shards is not None):
+            raise ValueError("--serve cannot be sharded.")
+        if args.serve and not args.insecure:
+            github_secret, jira_secret = _get_webhook_secrets()
+            missing = [key for key, secret in (("github.webhook_secret", github_secret),
+                                               ("jira.webhook_secret", jira_secret)) if not secret]
+            if missing:
+                raise ValueError(f"--serve needs {' and '.join(missing)} in the config to authenticate webhooks, "
+                                 "or --insecure to accept them from anyone.")
+        if args.shards is not None:
+            if args.shard or args.shards < 1:
+                raise ValueError("--shards must be a positive number of shards, and cannot be used with --shard.")
+        if args.shard:
+            shard = _parse_shard(args.shard)
+            if not args.run_id:
+                raise ValueError("--shard needs a --run-id, shared by every shard of the run.")
+    except ValueError as e:
+        print(f"Error: {e}")
+        exit(1)
+
+    lock_file = _shard_path(args.lock_file, shard)
+    lock = RunLock(lock_file)
+    if not lock.acquire():
+        print(f"Another run is in progress (lock file '{lock_file}'), exiting.")
+        return
+    try:
+        if args.shards is not None:
+            exit(_run_shards(args.shards, sys.argv[1:]))
+        _run(args, teams, shard, deadline)
+    finally:
+        lock.release()
+
+
+def _run(args, teams, shard, deadline):
+    """Run the assignment, or the webhook server, once the arguments are validated and the run lock taken."""
+    global DEBUG_MODE, LEDGER, REVIEWER_LOAD, DEADLINE, CHECKPOINT
 
     # Set debug mode globally
     DEBUG_MODE = args.debug
 
     # Also set debug mode in the prs module
     from bin.gh import prs
+    from bin.jira import tickets
     prs.DEBUG_MODE = args.debug
-
-    slack_users_by_gh_users_dict = load_authors(AUTHORS_FILE)
-    gh_users = slack_users_by_gh_users_dict.keys()
-    prs_list = get_ready_prs_by_authors(ORG, REPO, gh_users, GH_TOKEN)
+    client.DEBUG_MODE = args.debug
+    client.configure(pool_size=max(args.pool_size, args.concurrency))
+    # Shards run at the same time, each writes its own trace, recording, caches and ledger
+    trace_file = _shard_path(args.trace, shard) if args.trace else None
+    if args.record_http:
+        client.set_transport(Recorder(_shard_path(args.record_http, shard)).adapter)
+    elif args.replay_http:
+        client.set_transport(Replayer(args.replay_http).adapter)
+    if trace_file:
+        trace.enable()
+    if not args.no_cache:
+        prs.CACHE = ResponseCache(_shard_path(GH_CACHE_FILE, shard))
+        tickets.TRANSITION_CACHE = TransitionCache(_shard_path(TRANSITION_CACHE_FILE, shard))
+        LEDGER = PRLedger(_shard_path(DEFAULT_LEDGER_FILE, shard))
+    if shard:
+        REVIEWER_LOAD = ReviewerLoad(args.run_id, *shard, path=args.load_file)
+    DEADLINE = deadline
+    CHECKPOINT = None
+    if args.checkpoint:
+        CHECKPOINT = Checkpoint(_shard_path(args.checkpoint, shard))
+
+    slack_users_by_gh_users_dict = {}
+    for team in teams:
+        slack_users_by_gh_users_dict.update(team)
+    teammates = _get_teammates(teams)
+    if args.serve:
+        webhooks.DEBUG_MODE = args.debug
+        serve(args.port, slack_users_by_gh_users_dict, teammates, args.concurrency, args.record_webhooks)
+        return
+    prs_list, pr_reviews = _fetch_open_prs(settings.get_repos(), teammates, args.graphql, args.search)
+    if shard:
+        prs_list = [(org, repo, pr) for org, repo, pr in prs_list if pr.number % shard[1] == shard[0]]
 
     if not prs_list:
         print("No pull requests found for this user.")
+        if REVIEWER_LOAD:
+            # The other shards must not wait for this one
+            REVIEWER_LOAD.mark_counted()
         return
-    assign_pending_prs(prs_list, slack_users_by_gh_users_dict, gh_users)
+    assign_pending_prs(prs_list, slack_users_by_gh_users_dict, teammates, args.concurrency, pr_reviews,
+                       plan_only=args.plan_only)
     print()
+    client.print_summary()
+    if trace_file:
+        trace.print_summary()
+        trace.write(trace_file)
+    client.close()
+    if prs.CACHE:
+        prs.CACHE.close()
+    if tickets.TRANSITION_CACHE:
+        tickets.TRANSITION_CACHE.close()
+    if LEDGER:
+        LEDGER.close()
+    if REVIEWER_LOAD:
+        REVIEWER_LOAD.close()
 
 
 if __name__ == "__main__":
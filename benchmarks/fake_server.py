@@ -0,0 +1,264 @@
+import json
+import random
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+JIRA_STATUSES = ["Code Review", "In Review", "QA Review", "In Progress"]
+REVIEW_STATES = ["APPROVED", "COMMENTED", "CHANGES_REQUESTED"]
+PAGE_SIZE = 100
+RATE_LIMIT = 5000
+
+
+def _github_date(date):
+    return date.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _jira_date(date):
+    return date.strftime("%Y-%m-%dT%H:%M:%S.000+0000")
+
+
+def generate_org(prs, reviewers, reviews, seed=0):
+    """
+    Synthesize the GitHub and JIRA data of an organization.
+
+    Args:
+        prs (int): Number of PRs. Every PR is open, and also listed as merged in the closed PRs.
+        reviewers (int): Number of team members, who author and review the PRs.
+        reviews (int): Number of reviews (and of other timeline events) per PR.
+        seed (int): Seed of the random generator, the same arguments always give the same data.
+
+    Returns:
+        dict: The data served by FakeServer.
+    """
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    users = [f"user{i}" for i in range(reviewers)]
+    data = {"users": users, "pulls": [], "reviews": {}, "requested_reviewers": {}, "timeline": {}, "tickets": {}}
+    for number in range(1, prs + 1):
+        author = users[number % reviewers]
+        others = [user for user in users if user != author] or users
+        updated_at = now - timedelta(hours=number)
+        ticket = f"PROJ-{1000 + number}"
+        data["pulls"].append({
+            "number": number,
+            "html_url": f"https://github.com/org/repo/pull/{number}",
+            "title": f"{ticket} Change number {number} | details",
+            "draft": number % 20 == 0,
+            "state": "open",
+            "user": {"login": author},
+            "head": {"sha": f"{number:040x}"},
+            "updated_at": _github_date(updated_at),
+            "merged_at": _github_date(updated_at),
+        })
+        data["reviews"][number] = [
+            {"user": {"login": rng.choice(others)}, "state": rng.choice(REVIEW_STATES),
+             "submitted_at": _github_date(updated_at - timedelta(minutes=i))}
+            for i in range(reviews)
+        ]
+        requested = rng.sample(others, k=min(len(others), rng.randint(0, 1)))
+        data["requested_reviewers"][number] = requested
+        data["timeline"][number] = [
+            {"event": "commented", "actor": {"login": rng.choice(users)},
+             "created_at": _github_date(updated_at - timedelta(hours=2, minutes=i))}
+            for i in range(reviews)
+        ] + [
+            {"event": "review_requested", "requested_reviewer": {"login": user},
+             "created_at": _github_date(updated_at - timedelta(hours=1))}
+            for user in requested
+        ]
+        data["tickets"][ticket] = {
+            "status": rng.choice(JIRA_STATUSES),
+            "changed_at": now - timedelta(days=rng.randint(0, 5), hours=1),
+            "created_at": now - timedelta(days=10),
+        }
+    return data
+
+
+class FakeServer:
+    """
+    Local HTTP server answering the GitHub and JIRA endpoints used by bin.gh.prs and bin.jira.tickets from data
+    generated by generate_org. Point bin.gh.prs.GITHUB_API and the JIRA base URL to `url`.
+    """
+
+    def __init__(self, data, host="127.0.0.1", port=0):
+        self.data = data
+        self.lock = threading.Lock()
+        self.requests = 0
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                fake.handle(self, "GET")
+
+            def do_POST(self):
+                fake.handle(self, "POST")
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handle(self, handler, method):
+        parts = urlsplit(handler.path)
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        body = None
+        if method == "POST":
+            body = json.loads(handler.rfile.read(int(handler.headers.get("Content-Length", 0))) or b"null")
+        with self.lock:
+            self.requests += 1
+            remaining = max(0, RATE_LIMIT - self.requests)
+            status, payload, headers = self.route(method, parts.path, query, body)
+        content = json.dumps(payload).encode() if payload is not None else b""
+        handler.send_response(status)
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(content)))
+        handler.send_header("X-RateLimit-Limit", str(RATE_LIMIT))
+        handler.send_header("X-RateLimit-Remaining", str(remaining))
+        handler.end_headers()
+        handler.wfile.write(content)
+
+    def _page(self, path, query, items):
+        page = int(query.get("page", 1))
+        headers = {}
+        if page * PAGE_SIZE < len(items):
+            next_query = urlencode(dict(query, page=page + 1))
+            headers["Link"] = f'<{self.url}{path}?{next_query}>; rel="next"'
+        return 200, items[(page - 1) * PAGE_SIZE:page * PAGE_SIZE], headers
+
+    def route(self, method, path, query, body):
+        data = self.data
+        match = re.fullmatch(r"/repos/[^/]+/[^/]+/pulls", path)
+        if match:
+            if query.get("state") == "closed":
+                pulls = [dict(pr, state="closed") for pr in data["pulls"]]
+            else:
+                pulls = data["pulls"]
+            return self._page(path, query, pulls)
+        match = re.fullmatch(r"/repos/[^/]+/[^/]+/pulls/(\d+)/reviews", path)
+        if match:
+            return self._page(path, query, data["reviews"][int(match.group(1))])
+        match = re.fullmatch(r"/repos/[^/]+/[^/]+/pulls/(\d+)/requested_reviewers", path)
+        if match:
+            requested = data["requested_reviewers"][int(match.group(1))]
+            if method == "POST":
+                requested.extend(user for user in body["reviewers"] if user not in requested)
+                return 201, {}, {}
+            return 200, {"users": [{"login": user} for user in requested], "teams": []}, {}
+        match = re.fullmatch(r"/repos/[^/]+/[^/]+/issues/(\d+)/timeline", path)
+        if match:
+            return self._page(path, query, data["timeline"][int(match.group(1))])
+        if path == "/search/issues":
+            return self.search_issues(query)
+        if path == "/graphql":
+            return self.graphql(body)
+        match = re.fullmatch(r"/rest/api/3/issue/([A-Z]+-\d+)(/transitions)?", path)
+        if match:
+            return self.jira_issue(method, match.group(1), bool(match.group(2)))
+        if path == "/rest/api/3/search":
+            return self.jira_search(body)
+        return 404, {"message": "Not Found"}, {}
+
+    def search_issues(self, query):
+        merged = re.search(r"merged:(\S+)\.\.(\S+)", query["q"])
+        if merged:
+            start, end = merged.groups()
+            items = [
+                {"number": pr["number"], "user": pr["user"], "updated_at": pr["updated_at"],
+                 "closed_at": pr["merged_at"], "pull_request": {"merged_at": pr["merged_at"]}}
+                for pr in self.data["pulls"] if start <= pr["merged_at"] <= end
+            ]
+        else:
+            # Open PRs of some authors: is:pr is:open draft:false author:A author:B
+            authors = set(re.findall(r"author:(\S+)", query["q"]))
+            items = [
+                {key: pr[key] for key in ("number", "html_url", "title", "draft", "state", "user", "updated_at")}
+                for pr in self.data["pulls"]
+                if pr["user"]["login"] in authors and not ("draft:false" in query["q"] and pr["draft"])
+            ]
+        status, page, headers = self._page("/search/issues", query, items)
+        return status, {"total_count": len(items), "items": page}, headers
+
+    def graphql(self, body):
+        variables = body["variables"]
+        if "number" in variables:
+            reviews = [self._graphql_review(review) for review in self.data["reviews"][variables["number"]]]
+            page = {"pageInfo": {"hasNextPage": False, "endCursor": None}, "nodes": reviews}
+            return 200, {"data": {"repository": {"pullRequest": {"reviews": page}}}}, {}
+        start = int(variables.get("cursor") or 0)
+        pulls = self.data["pulls"][start:start + 50]
+        nodes = [{
+            "number": pr["number"], "url": pr["html_url"], "title": pr["title"], "isDraft": pr["draft"],
+            "updatedAt": pr["updated_at"], "headRefOid": pr["head"]["sha"], "author": pr["user"],
+            "reviews": {"pageInfo": {"hasNextPage": False, "endCursor": None},
+                        "nodes": [self._graphql_review(review) for review in self.data["reviews"][pr["number"]]]},
+            "reviewRequests": {"nodes": [{"requestedReviewer": {"login": user}}
+                                         for user in self.data["requested_reviewers"][pr["number"]]]},
+            "timelineItems": {"nodes": [
+                {"createdAt": event["created_at"], "requestedReviewer": event["requested_reviewer"]}
+                for event in self.data["timeline"][pr["number"]] if event["event"] == "review_requested"
+            ]},
+        } for pr in pulls]
+        has_next_page = start + 50 < len(self.data["pulls"])
+        page_info = {"hasNextPage": has_next_page, "endCursor": str(start + 50)}
+        return 200, {"data": {"repository": {"pullRequests": {"pageInfo": page_info, "nodes": nodes}}}}, {}
+
+    @staticmethod
+    def _graphql_review(review):
+        return {"state": review["state"], "submittedAt": review["submitted_at"], "author": review["user"]}
+
+    def _jira_fields(self, ticket):
+        return {
+            "status": {"name": ticket["status"]},
+            "created": _jira_date(ticket["created_at"]),
+            # Review statuses share the "In Progress" category, which the ticket entered when it was created
+            "statuscategorychangedate": _jira_date(ticket["created_at"]),
+            "project": {"key": "PROJ"},
+            "issuetype": {"name": "Story"},
+        }
+
+    def jira_issue(self, method, key, transitions):
+        ticket = self.data["tickets"].get(key)
+        if not ticket:
+            return 404, {"errorMessages": ["Issue does not exist"]}, {}
+        if transitions:
+            if method == "POST":
+                return 204, None, {}
+            return 200, {"transitions": [
+                {"id": "31", "name": "Ready for QA Review", "to": {"name": "QA Review"}},
+                {"id": "11", "name": "Start Progress", "to": {"name": "In Progress"}},
+            ]}, {}
+        return 200, {"key": key, "fields": self._jira_fields(ticket), "changelog": self._jira_changelog(ticket)}, {}
+
+    @staticmethod
+    def _jira_changelog(ticket):
+        histories = [{"created": _jira_date(ticket["changed_at"]), "items": [
+            {"field": "status", "fromString": "In Progress", "toString": ticket["status"]}]}]
+        return {"startAt": 0, "maxResults": len(histories), "total": len(histories), "histories": histories}
+
+    def jira_search(self, body):
+        keys = [key for key in re.findall(r"[A-Z]+-\d+", body["jql"]) if key in self.data["tickets"]]
+        start, max_results = body.get("startAt", 0), body.get("maxResults", 50)
+        issues = [{"key": key, "fields": self._jira_fields(self.data["tickets"][key])}
+                  for key in keys[start:start + max_results]]
+        if "changelog" in body.get("expand", []):
+            for issue in issues:
+                issue["changelog"] = self._jira_changelog(self.data["tickets"][issue["key"]])
+        return 200, {"startAt": start, "maxResults": max_results, "total": len(keys), "issues": issues}, {}
@@ -0,0 +1,152 @@
+#!./.venv/bin/python
+"""
+Offline benchmark of assignees.py and pr_approval_stats.py.
+
+Runs both entry points against a local FakeServer synthesizing organizations of several sizes, and reports wall
+time, number of HTTP requests and peak Python memory for each. Results can be saved with --output and compared to a
+previous run with --compare, which exits with an error when a benchmark regressed.
+
+Usage:
+    python -m benchmarks.run --scales 10x5x3,100x20x5 --output results.json
+    python -m benchmarks.run --compare results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fake_server import FakeServer, generate_org
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SCALES = "10x5x3,100x20x5,500x50x10"
+
+
+def _configure_settings(users, url):
+    from bin import settings
+
+    settings.configure(
+        config={
+            "github": {"org": "org", "repo": "repo"},
+            "jira": {"base_url": url, "email": "bench@example.com", "ticket_number_regex": "PROJ-[1-9][0-9]+"},
+            "authors_file": "authors.txt",
+        },
+        authors={"authors.txt": {user: user.capitalize() for user in users}},
+        tokens={"github": "token", "jira": "token"},
+    )
+
+
+def _measure(name, scale, entry_point, argv):
+    from bin import client
+    from bin.gh import prs
+
+    client.reset_stats()
+    prs.clear_memo()
+    random.seed(0)
+    sys.argv = [name] + argv
+    tracemalloc.start()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        entry_point()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    client.close()
+    return {"benchmark": name, "scale": scale, "seconds": round(elapsed, 3), "requests": len(client.get_calls()),
+            "peak_memory_kb": peak // 1024}
+
+
+def run_benchmarks(scales, concurrency):
+    """
+    Run both entry points at every scale.
+
+    Args:
+        scales (list): (prs, reviewers, reviews) tuples.
+        concurrency (int): Value of assignees.py --concurrency.
+
+    Returns:
+        list: One result dict per entry point and scale.
+    """
+    results = []
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    import assignees
+    import pr_approval_stats
+    from bin.gh import prs
+
+    directory = tempfile.mkdtemp(prefix="pr-assignees-bench-")
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        for prs_count, reviewers, reviews in scales:
+            scale = f"{prs_count}x{reviewers}x{reviews}"
+            server = FakeServer(generate_org(prs_count, reviewers, reviews)).start()
+            _configure_settings(server.data["users"], server.url)
+            prs.GITHUB_API = server.url
+            results.append(_measure("assignees", scale, assignees.main,
+                                    ["--no-cache", "--concurrency", str(concurrency)]))
+            results.append(_measure("pr_approval_stats", scale, pr_approval_stats.main,
+                                    ["--no_cache", "--last_days", "30", "--store_file", f"store-{scale}.sqlite"]))
+            server.stop()
+    finally:
+        os.chdir(cwd)
+    return results
+
+
+def _print_results(results):
+    print(f"{'benchmark':<20} {'scale':<12} {'seconds':>9} {'requests':>9} {'peak KB':>9}")
+    for result in results:
+        print(f"{result['benchmark']:<20} {result['scale']:<12} {result['seconds']:>9.3f} {result['requests']:>9} "
+              f"{result['peak_memory_kb']:>9}")
+
+
+def compare(results, baseline, tolerance):
+    """Return a description of every result slower, more memory hungry or making more requests than its baseline."""
+    baseline = {(result["benchmark"], result["scale"]): result for result in baseline}
+    regressions = []
+    for result in results:
+        previous = baseline.get((result["benchmark"], result["scale"]))
+        if not previous:
+            continue
+        name = f"{result['benchmark']} {result['scale']}"
+        if result["requests"] > previous["requests"]:
+            regressions.append(f"{name}: {result['requests']} requests instead of {previous['requests']}")
+        if result["seconds"] > previous["seconds"] * (1 + tolerance):
+            regressions.append(f"{name}: {result['seconds']}s instead of {previous['seconds']}s")
+        if result["peak_memory_kb"] > previous["peak_memory_kb"] * (1 + tolerance):
+            regressions.append(f"{name}: {result['peak_memory_kb']}KB instead of {previous['peak_memory_kb']}KB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark assignees.py and pr_approval_stats.py offline.")
+    parser.add_argument("--scales", type=str, default=DEFAULT_SCALES,
+                        help="Comma separated PRSxREVIEWERSxREVIEWS organization sizes.")
+    parser.add_argument("--concurrency", type=int, default=8, help="assignees.py --concurrency value.")
+    parser.add_argument("--output", type=str, default=None, help="Save the results to this JSON file.")
+    parser.add_argument("--compare", type=str, default=None, help="Compare the results to this JSON file.")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative increase of time and memory before reporting a regression.")
+    args = parser.parse_args()
+    scales = [tuple(int(value) for value in scale.split("x")) for scale in args.scales.split(",")]
+    results = run_benchmarks(scales, args.concurrency)
+    _print_results(results)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare, "r") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from bin import trace
+
+# Connection pool settings shared by every session
+POOL_SIZE = 10
+TIMEOUT = 30
+
+# Retry settings for rate limited (429) and failed (5xx) requests
+MAX_RETRIES = 5
+BACKOFF_BASE = 1
+BACKOFF_MAX = 60
+# Longest wait for a host's exhausted rate limit to reset before giving up
+MAX_RESET_WAIT = 300
+# Below this fraction of its rate limit left, fewer requests run in parallel against a host
+LOW_BUDGET_FRACTION = 0.2
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Global debug flag
+DEBUG_MODE = False
+
+# When set, called to build the transport adapter of each new session instead of the pooled HTTPAdapter
+ADAPTER_FACTORY = None
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_calls = []
+_calls_lock = threading.Lock()
+# Rate limit budget and requests in flight, by host
+_budgets = {}
+_budgets_condition = threading.Condition()
+
+
+def debug_print(*args, **kwargs):
+    """Print debug information only when debug mode is enabled."""
+    if DEBUG_MODE:
+        print("DEBUG:", *args, **kwargs)
+
+
+def configure(pool_size=None, timeout=None):
+    """
+    Change the pool size and default timeout used by sessions created from now on.
+
+    Args:
+        pool_size (int): Maximum number of keep-alive connections kept per host.
+        timeout (float): Default timeout in seconds for every request.
+    """
+    global POOL_SIZE, TIMEOUT
+    if pool_size is not None:
+        POOL_SIZE = int(pool_size)
+    if timeout is not None:
+        TIMEOUT = timeout
+
+
+def set_transport(adapter_factory):
+    """
+    Make the sessions created from now on send their requests through `adapter_factory()` (a requests transport
+    adapter, e.g. to record or replay traffic) instead of a pooled HTTPAdapter. Existing sessions are closed.
+    Pass None to go back to the pooled HTTPAdapter.
+    """
+    global ADAPTER_FACTORY
+    close()
+    ADAPTER_FACTORY = adapter_factory
+
+
+def _host(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def get_session(base_url, headers=None, auth=None):
+    """
+    Return the pooled session for a host, creating it on first use.
+
+    Sessions are keyed by host and credentials, so every call made with the same token reuses
+    the same keep-alive connections and the same default headers.
+
+    Args:
+        base_url (str): Any URL on the host (e.g., 'https://api.github.com').
+        headers (dict): Default headers sent with every request of the session.
+        auth (tuple): Optional (user, token) pair used for basic auth.
+
+    Returns:
+        requests.Session: The shared session.
+    """
+    host = _host(base_url)
+    key = (host, tuple(sorted((headers or {}).items())), auth)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            if ADAPTER_FACTORY:
+                adapter = ADAPTER_FACTORY()
+            else:
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount(host, adapter)
+            session.headers.update(headers or {})
+            if auth:
+                session.auth = auth
+            _sessions[key] = session
+    return session
+
+
+def _get_budget(host):
+    budget = _budgets.get(host)
+    if budget is None:
+        budget = {"limit": None, "remaining": None, "reset": None, "in_flight": 0, "calls": 0, "retries": 0}
+        _budgets[host] = budget
+    return budget
+
+
+def _parse_reset(value):
+    # GitHub sends the reset time as epoch seconds, Jira as an ISO date
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+        except ValueError:
+            return None
+
+
+def _allowed_in_flight(budget):
+    if not budget["limit"] or budget["remaining"] is None:
+        return POOL_SIZE
+    fraction = budget["remaining"] / budget["limit"]
+    if fraction >= LOW_BUDGET_FRACTION:
+        return POOL_SIZE
+    return max(1, int(POOL_SIZE * fraction / LOW_BUDGET_FRACTION))
+
+
+def _acquire(host):
+    with _budgets_condition:
+        budget = _get_budget(host)
+        while budget["in_flight"] >= _allowed_in_flight(budget):
+            _budgets_condition.wait()
+        budget["in_flight"] += 1
+        wait = 0
+        if budget["remaining"] == 0 and budget["reset"]:
+            wait = budget["reset"] - time.time()
+    if wait > MAX_RESET_WAIT:
+        _release(host)
+        raise Exception(f"Rate limit of {host} exhausted until {datetime.fromtimestamp(budget['reset'])}.")
+    if wait > 0:
+        debug_print(f"Rate limit of {host} exhausted, waiting {wait:.0f}s for it to reset")
+        time.sleep(wait)
+
+
+def _release(host):
+    with _budgets_condition:
+        _get_budget(host)["in_flight"] -= 1
+        _budgets_condition.notify_all()
+
+
+def _update_budget(host, response):
+    headers = response.headers
+    with _budgets_condition:
+        budget = _get_budget(host)
+        budget["calls"] += 1
+        if headers.get("X-RateLimit-Limit", "").isdigit():
+            budget["limit"] = int(headers["X-RateLimit-Limit"])
+        if headers.get("X-RateLimit-Remaining", "").isdigit():
+            budget["remaining"] = int(headers["X-RateLimit-Remaining"])
+        if headers.get("X-RateLimit-Reset"):
+            budget["reset"] = _parse_reset(headers["X-RateLimit-Reset"])
+        _budgets_condition.notify_all()
+
+
+def _is_rate_limited(response):
+    # GitHub answers 403 instead of 429 when the primary or a secondary rate limit is hit
+    return response.status_code == 429 or (response.status_code == 403 and (
+        response.headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in response.headers))
+
+
+def _retry_delay(response, attempt):
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return int(retry_after)
+        if response.headers.get("X-RateLimit-Remaining") == "0" and response.headers.get("X-RateLimit-Reset"):
+            reset = _parse_reset(response.headers["X-RateLimit-Reset"])
+            if reset:
+                return max(0, reset - time.time())
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def request(session, method, url, idempotent=None, **kwargs):
+    """
+    Perform a request through a pooled session and record how long it took.
+
+    Requests are throttled when the host's rate limit budget runs low. Rate limited requests are retried with
+    jittered exponential backoff (honouring Retry-After); 5xx answers and connection errors are retried too when
+    the request is idempotent.
+
+    Args:
+        session (requests.Session): Session returned by get_session.
+        method (str): HTTP method.
+        url (str): Full URL to call.
+        idempotent (bool): Whether the request can safely be retried after a 5xx or a connection error.
+            Defaults to True for GET, HEAD and OPTIONS.
+        **kwargs: Passed through to requests (json, params, headers...).
+
+    Returns:
+        requests.Response: The response, whatever its status code.
+    """
+    if idempotent is None:
+        idempotent = method in IDEMPOTENT_METHODS
+    kwargs.setdefault("timeout", TIMEOUT)
+    host = _host(url)
+    attempt = 0
+    while True:
+        _acquire(host)
+        started = time.perf_counter()
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if not idempotent or attempt >= MAX_RETRIES:
+                raise
+            response = None
+            debug_print(f"{method} {url} failed: {e}")
+        finally:
+            _release(host)
+        elapsed = time.perf_counter() - started
+        if trace.ENABLED:
+            trace.add_span(trace.get_endpoint(method, url), "http", started, elapsed, url=url,
+                           status=response.status_code if response is not None else None,
+                           bytes=len(response.content) if response is not None else 0, attempt=attempt)
+        if response is not None:
+            _update_budget(host, response)
+            with _calls_lock:
+                _calls.append((method, url, response.status_code, elapsed))
+            debug_print(f"{method} {url} -> {response.status_code} in {elapsed * 1000:.0f}ms")
+            should_retry = _is_rate_limited(response) or (idempotent and response.status_code in RETRY_STATUS_CODES)
+            if not should_retry or attempt >= MAX_RETRIES:
+                return response
+        delay = _retry_delay(response, attempt)
+        if delay > MAX_RESET_WAIT:
+            return response
+        attempt += 1
+        with _budgets_condition:
+            _get_budget(host)["retries"] += 1
+        debug_print(f"Retrying {method} {url} in {delay:.1f}s (attempt {attempt} of {MAX_RETRIES})")
+        time.sleep(delay)
+
+
+def get_calls():
+    """Return the (method, url, status, seconds) tuples of every request made so far."""
+    with _calls_lock:
+        return list(_calls)
+
+
+def print_summary(file=None):
+    """Print, to stderr by default, the calls made, retries and rate limit budget left for every host called."""
+    file = file or sys.stderr
+    with _budgets_condition:
+        budgets = {host: dict(budget) for host, budget in _budgets.items()}
+    for host, budget in sorted(budgets.items()):
+        line = f"{host}: {budget['calls']} calls, {budget['retries']} retries"
+        if budget["remaining"] is not None:
+            line += f", rate limit left {budget['remaining']}"
+            if budget["limit"]:
+                line += f"/{budget['limit']}"
+        print(line, file=file)
+
+
+def reset_stats():
+    """Forget the calls made and rate limit budgets seen so far."""
+    with _calls_lock:
+        _calls.clear()
+    with _budgets_condition:
+        _budgets.clear()
+
+
+def close():
+    """Close every pooled session."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,117 @@
+import json
+import threading
+
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+# Response headers kept in fixtures; everything else (cookies, request ids...) is dropped
+RECORDED_HEADERS = (
+    "Content-Type", "Link", "ETag", "Last-Modified", "Retry-After",
+    "X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset",
+)
+
+
+def _request_body(request):
+    body = request.body
+    if isinstance(body, bytes):
+        body = body.decode()
+    return body
+
+
+class Recorder:
+    """
+    Records every request/response pair sent through the sessions of bin.client into a JSON lines fixture file.
+
+    Only the method, URL and body of requests are stored, never their headers, so tokens do not end up in fixtures.
+
+    Usage:
+        client.set_transport(Recorder("fixture.jsonl").adapter)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # Start from an empty fixture
+        open(self.path, "w").close()
+
+    def record(self, request, response):
+        entry = {
+            "method": request.method,
+            "url": request.url,
+            "body": _request_body(request),
+            "status": response.status_code,
+            "headers": {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+            "content": response.content.decode(response.encoding or "utf-8"),
+        }
+        with self._lock:
+            with open(self.path, "a") as file:
+                file.write(json.dumps(entry) + "\n")
+
+    def adapter(self):
+        return _RecordingAdapter(self)
+
+
+class _RecordingAdapter(HTTPAdapter):
+    def __init__(self, recorder):
+        super().__init__()
+        self.recorder = recorder
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        self.recorder.record(request, response)
+        return response
+
+
+class Replayer:
+    """
+    Answers the requests sent through the sessions of bin.client from a fixture file written by Recorder, without
+    any network access.
+
+    Requests are matched on method, URL and body. When the same request was recorded several times, the recorded
+    responses are replayed in order, the last one being repeated once exhausted.
+
+    Usage:
+        client.set_transport(Replayer("fixture.jsonl").adapter)
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._responses = {}
+        with open(path, "r") as file:
+            for line in file:
+                if line.strip():
+                    entry = json.loads(line)
+                    key = (entry["method"], entry["url"], entry["body"])
+                    self._responses.setdefault(key, []).append(entry)
+
+    def replay(self, request):
+        key = (request.method, request.url, _request_body(request))
+        with self._lock:
+            entries = self._responses.get(key)
+            if not entries:
+                raise Exception(f"No recorded response for {request.method} {request.url}")
+            entry = entries.pop(0) if len(entries) > 1 else entries[0]
+        response = Response()
+        response.status_code = entry["status"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = entry["content"].encode()
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def adapter(self):
+        return _ReplayAdapter(self)
+
+
+class _ReplayAdapter(BaseAdapter):
+    def __init__(self, replayer):
+        super().__init__()
+        self.replayer = replayer
+
+    def send(self, request, **kwargs):
+        return self.replayer.replay(request)
+
+    def close(self):
+        pass
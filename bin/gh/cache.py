@@ -0,0 +1,91 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_FILE = ".gh_cache.sqlite"
+# Bodies are evicted, least recently used first, once the cache grows past this size
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+# Bumped whenever the keys or the table change; caches with an older schema are emptied
+_SCHEMA_VERSION = 1
+
+
+def cache_key(url, authorization=None):
+    """
+    Return the key of the response of a URL fetched with an Authorization header. Tokens are only stored hashed, and
+    a response fetched with one token is never served to a run using another, which may not be allowed to see it.
+    """
+    credentials = hashlib.sha256((authorization or "").encode()).hexdigest()[:16]
+    return f"{credentials} {url}"
+
+
+class ResponseCache:
+    """
+    On-disk cache of GitHub GET responses, keyed by URL and credentials (see cache_key).
+
+    Stores the body together with its ETag / Last-Modified validators so the next request for the same URL can be
+    made conditional. GitHub answers unchanged resources with a 304, which does not count against the rate limit.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_FILE, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+            self._conn.executescript(
+                f"DROP TABLE IF EXISTS responses; PRAGMA user_version = {_SCHEMA_VERSION};"
+            )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, link TEXT, body TEXT NOT NULL,"
+            " size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._conn.commit()
+
+    def get(self, url):
+        """Return the cached entry of a cache_key as a dict with 'etag', 'last_modified', 'link' and 'body', or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, link, body FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if not row:
+            return None
+        etag, last_modified, link, body = row
+        return {"etag": etag, "last_modified": last_modified, "link": link, "body": json.loads(body)}
+
+    def touch(self, url):
+        """Mark a cache_key as recently used, so it is evicted last."""
+        with self._lock:
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def put(self, url, etag, last_modified, link, body):
+        """Store the response of a cache_key, evicting the least recently used entries if the cache is too big."""
+        body = json.dumps(body)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (url, etag, last_modified, link, body, size, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, link, body, len(body), time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        to_delete = []
+        for url, size in self._conn.execute("SELECT url, size FROM responses ORDER BY accessed_at"):
+            if total <= self.max_bytes:
+                break
+            to_delete.append((url,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE url = ?", to_delete)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
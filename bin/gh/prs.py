@@ -1,12 +1,36 @@
 #!./.venv/bin/python
 import re
+import threading
+from dataclasses import replace
+from datetime import timedelta
+from urllib.parse import quote_plus
+
 import requests
 
+from bin import client, trace
+from bin.gh.cache import cache_key
+from bin.records import PR, Review, ReviewEvent, ReviewRequest, parse_github_date
+
 GITHUB_API = "https://api.github.com"
 
 # Global debug flag
 DEBUG_MODE = False
 
+# Optional bin.gh.cache.ResponseCache used to make GET requests conditional
+CACHE = None
+
+# Per PR endpoints, fetched at most once per run
+PR_ENDPOINTS = {
+    "reviews": "pulls/{number}/reviews",
+    "requested_reviewers": "pulls/{number}/requested_reviewers",
+    "timeline": "issues/{number}/timeline",
+}
+# The ones among them returning paginated lists
+PAGINATED_PR_ENDPOINTS = ("reviews", "timeline")
+
+_memo = {}
+_memo_lock = threading.Lock()
+
 
 def debug_print(*args, **kwargs):
     """Print debug information only when debug mode is enabled."""
@@ -21,42 +45,126 @@ def _get_headers(token):
     }
 
 
+def _get_session(token):
+    return client.get_session(GITHUB_API, headers=_get_headers(token))
+
+
+def _get(session, url):
+    """
+    GET a GitHub URL and return its JSON body and Link header.
+    When a cache is configured the request carries the cached validators, and a 304 answer is served from the cache.
+    """
+    key = cache_key(url, session.headers.get("Authorization"))
+    cached = CACHE.get(key) if CACHE else None
+    headers = {}
+    if cached:
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+    response = client.request(session, "GET", url, headers=headers)
+    if cached and response.status_code == 304:
+        debug_print("cache hit:", url)
+        CACHE.touch(key)
+        return cached["body"], cached["link"]
+    response.raise_for_status()
+    body = response.json()
+    link_header = response.headers.get("Link")
+    etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+    if CACHE and (etag or last_modified):
+        CACHE.put(key, etag, last_modified, link_header, body)
+    return body, link_header
+
+
+def _get_pr_resource(endpoint, org, repo, pull_number, token):
+    """GET one of the PR_ENDPOINTS of a PR, reusing the body already fetched during this run if there is one."""
+    key = (endpoint, org, repo, pull_number)
+    with _memo_lock:
+        if key in _memo:
+            return _memo[key]
+    url = f"{GITHUB_API}/repos/{org}/{repo}/" + PR_ENDPOINTS[endpoint].format(number=pull_number)
+    with trace.span(f"{endpoint} {org}/{repo}#{pull_number}", "github"):
+        body, _ = _get(_get_session(token), url)
+    with _memo_lock:
+        _memo[key] = body
+    return body
+
+
+def _iter_pr_resource(endpoint, org, repo, pull_number, token):
+    """
+    Iterate over the items of one of the PAGINATED_PR_ENDPOINTS of a PR, following every page.
+
+    Items are yielded as each page arrives. Once every page was read, the items are kept for the rest of the run
+    like _get_pr_resource does, so iterating again costs no request.
+    """
+    key = (endpoint, org, repo, pull_number)
+    with _memo_lock:
+        items = _memo.get(key)
+    if items is not None:
+        yield from items
+        return
+    session = _get_session(token)
+    url = f"{GITHUB_API}/repos/{org}/{repo}/" + PR_ENDPOINTS[endpoint].format(number=pull_number) + "?per_page=100"
+    items = []
+    with trace.span(f"{endpoint} {org}/{repo}#{pull_number}", "github") as details:
+        while url:
+            page, link_header = _get(session, url)
+            items.extend(page)
+            yield from page
+            url = get_next_page_url(link_header)
+        details["items"] = len(items)
+    with _memo_lock:
+        _memo[key] = items
+
+
+def clear_memo(org=None, repo=None, pull_number=None):
+    """
+    Forget the PR data fetched so far, so the next calls fetch it again.
+    Without arguments everything is forgotten, e.g. at the start of a new run; with them, only the data of one PR.
+    """
+    with _memo_lock:
+        if pull_number is None:
+            _memo.clear()
+            return
+        for endpoint in PR_ENDPOINTS:
+            _memo.pop((endpoint, org, repo, pull_number), None)
+
+
 def _is_pr_ready_for_review(pr):
-    return not pr["draft"] and pr["state"] == "open"
+    return not pr.draft and pr.state == "open"
 
 
 def _is_pr_author_in_list(pr, authors):
-    return (pr["user"]["login"] or "").lower() in authors
+    return pr.author in authors
 
 
 def get_next_page_url(link_header):
+    if not link_header:
+        return None
     # Regex to find the URL corresponding to the 'rel=next' in the Link header
-    match = re.search(r'<(https://[^>]+)>; rel="next"', link_header)
+    match = re.search(r'<(https?://[^>]+)>; rel="next"', link_header)
     if match:
         return match.group(1)  # Extracted URL
     return None
 
 
 def get_ready_prs_by_authors(org, repo, authors, token):
-    headers = _get_headers(token)
-    url = f"{GITHUB_API}/repos/{org}/{repo}/pulls?state=open&per_page=100"
-    all_prs = []
-    while url:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        prs = response.json()
-        all_prs.extend([pr for pr in prs if _is_pr_ready_for_review(pr) and _is_pr_author_in_list(pr, authors)])
-        link_header = response.headers.get("Link")
-        url = get_next_page_url(link_header)
-    return all_prs
+    """Return the open, non draft PRs of `authors` (lowercase GitHub usernames), as bin.records.PR records."""
+    with trace.span(f"open PRs {org}/{repo}", "github"):
+        session = _get_session(token)
+        url = f"{GITHUB_API}/repos/{org}/{repo}/pulls?state=open&per_page=100"
+        all_prs = []
+        while url:
+            prs, link_header = _get(session, url)
+            prs = [PR.from_github(pr) for pr in prs]
+            all_prs.extend([pr for pr in prs if _is_pr_ready_for_review(pr) and _is_pr_author_in_list(pr, authors)])
+            url = get_next_page_url(link_header)
+        return all_prs
 
 
 def get_commit_status(org, repo, sha, token):
     url = f"{GITHUB_API}/repos/{org}/{repo}/commits/{sha}/status"
-    headers = _get_headers(token)
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    status = response.json()
+    status, _ = _get(_get_session(token), url)
     return status["state"], status["statuses"]
 
 
@@ -64,25 +172,152 @@ def get_merged_prs_last_x_days(org, repo, token, last_days):
     from datetime import datetime, timedelta, timezone
 
     last_days = int(last_days)
-    thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=last_days)
-    headers = _get_headers(token)
-    url = f"{GITHUB_API}/repos/{org}/{repo}/pulls?state=closed&sort=updated&direction=desc&per_page=100"
-    all_merged_prs = []
-    page = 1
-
-    while url and page <= 6:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        prs = response.json()
-        merged_prs = [
-            pr for pr in prs
-            if pr.get('merged_at') and datetime.fromisoformat(pr['merged_at'].replace('Z', '+00:00')) > thirty_days_ago
-        ]
-        all_merged_prs.extend(merged_prs)
-        link_header = response.headers.get("Link")
+    return get_merged_prs_since(org, repo, token, datetime.now(timezone.utc) - timedelta(days=last_days))
+
+
+def get_merged_prs_since(org, repo, token, since):
+    """
+    Fetch the PRs merged after a given date.
+
+    Closed PRs are listed by most recently updated first, and a PR is always updated when it is merged, so listing
+    stops at the first page reaching PRs last updated before `since`.
+
+    Args:
+        org (str): The GitHub organization or username.
+        repo (str): The GitHub repository name.
+        token (str): Your GitHub personal access token.
+        since (datetime): Timezone aware date; only PRs merged after it are returned.
+
+    Returns:
+        list: The merged PRs, as bin.records.PR records.
+    """
+    with trace.span(f"merged PRs {org}/{repo}", "github"):
+        session = _get_session(token)
+        url = f"{GITHUB_API}/repos/{org}/{repo}/pulls?state=closed&sort=updated&direction=desc&per_page=100"
+        all_merged_prs = []
+
+        while url:
+            prs, link_header = _get(session, url)
+            prs = [PR.from_github(pr) for pr in prs]
+            merged_prs = [
+                pr for pr in prs
+                if pr.merged_at and pr.merged_at > since
+            ]
+            all_merged_prs.extend(merged_prs)
+            if prs and prs[-1].updated_at < since:
+                break
+            url = get_next_page_url(link_header)
+        return all_merged_prs
+
+
+# The Search API returns at most this many results per query
+SEARCH_MAX_RESULTS = 1000
+
+
+def search_merged_prs_since(org, repo, token, since):
+    """
+    Fetch the PRs merged after a given date through the Search API (`is:pr is:merged merged:>=DATE`), so only the
+    relevant PRs are downloaded.
+
+    Windows matching more than the 1000 results a search can return are split in halves until each part fits.
+
+    Args:
+        org (str): The GitHub organization or username.
+        repo (str): The GitHub repository name.
+        token (str): Your GitHub personal access token.
+        since (datetime): Timezone aware date; only PRs merged after it are returned.
+
+    Returns:
+        list: The merged PRs, as bin.records.PR records.
+    """
+    from datetime import datetime, timezone
+
+    with trace.span(f"search merged PRs {org}/{repo}", "github"):
+        return _search_merged_prs(_get_session(token), org, repo, since, datetime.now(timezone.utc))
+
+
+def _search_merged_prs(session, org, repo, start, end):
+    date_format = "%Y-%m-%dT%H:%M:%SZ"
+    query = f"repo:{org}/{repo} is:pr is:merged merged:{start.strftime(date_format)}..{end.strftime(date_format)}"
+    url = f"{GITHUB_API}/search/issues?q={quote_plus(query)}&sort=updated&order=desc&per_page=100"
+    merged_prs = []
+    while url:
+        result, link_header = _get(session, url)
+        if result["total_count"] > SEARCH_MAX_RESULTS and end - start > timedelta(seconds=1):
+            middle = start + (end - start) / 2
+            return (_search_merged_prs(session, org, repo, middle, end)
+                    + _search_merged_prs(session, org, repo, start, middle))
+        for item in result["items"]:
+            pr = PR.from_github(item)
+            if not pr.merged_at:
+                # Merged PRs found by the search are closed when they are merged
+                pr = replace(pr, merged_at=parse_github_date(item["closed_at"]))
+            if pr.merged_at > start:
+                merged_prs.append(pr)
         url = get_next_page_url(link_header)
-        page += 1
-    return all_merged_prs
+    return merged_prs
+
+
+# GitHub rejects search queries longer than this
+SEARCH_MAX_QUERY_LENGTH = 256
+
+
+def _chunk_authors(prefix, authors):
+    """Split `authors` in groups whose `author:` qualifiers fit in a search query starting with `prefix`."""
+    chunks = []
+    query = prefix
+    for author in authors:
+        qualifier = f" author:{author}"
+        if chunks and len(query) + len(qualifier) <= SEARCH_MAX_QUERY_LENGTH:
+            chunks[-1].append(author)
+            query += qualifier
+        else:
+            chunks.append([author])
+            query = prefix + qualifier
+    return chunks
+
+
+def search_ready_prs_by_authors(org, repo, authors, token):
+    """
+    Fetch the open, non draft PRs of `authors` through the Search API (`is:pr is:open draft:false author:A author:B`),
+    so only their PRs are downloaded instead of every open PR of the repository.
+
+    Authors are batched in as few queries as fit GitHub's query length limit. When a search fails (its rate limit is
+    much lower than the REST API's) or matches more PRs than a search can return, the open PRs are listed with
+    get_ready_prs_by_authors instead.
+
+    Args:
+        org (str): The GitHub organization or username.
+        repo (str): The GitHub repository name.
+        authors (iterable): Lowercase GitHub usernames.
+        token (str): Your GitHub personal access token.
+
+    Returns:
+        list: The PRs, as bin.records.PR records, most recent first like get_ready_prs_by_authors.
+    """
+    with trace.span(f"search open PRs {org}/{repo}", "github") as details:
+        session = _get_session(token)
+        prefix = f"repo:{org}/{repo} is:pr is:open draft:false"
+        prs_by_number = {}
+        try:
+            for chunk in _chunk_authors(prefix, sorted(authors)):
+                query = prefix + "".join(f" author:{author}" for author in chunk)
+                url = f"{GITHUB_API}/search/issues?q={quote_plus(query)}&sort=created&order=desc&per_page=100"
+                while url:
+                    result, link_header = _get(session, url)
+                    if result["total_count"] > SEARCH_MAX_RESULTS:
+                        raise ValueError(f"{result['total_count']} PRs match, more than a search can return")
+                    for item in result["items"]:
+                        pr = PR.from_github(item)
+                        # The search index can lag behind, e.g. for a PR just converted to draft
+                        if _is_pr_ready_for_review(pr) and _is_pr_author_in_list(pr, authors):
+                            prs_by_number[pr.number] = pr
+                    url = get_next_page_url(link_header)
+        except (requests.HTTPError, ValueError) as e:
+            print(f"Searching the open PRs of {org}/{repo} failed ({e}), listing all of them instead")
+            details["fallback"] = True
+            return get_ready_prs_by_authors(org, repo, authors, token)
+        return [prs_by_number[number] for number in sorted(prs_by_number, reverse=True)]
 
 
 def get_pr_approvers_and_past_reviewers(org, repo, pull_number, token):
@@ -98,62 +333,133 @@ def get_pr_approvers_and_past_reviewers(org, repo, pull_number, token):
     Returns:
     --------
         tuple: A tuple containing:
-            - list: A list of tuples containing the usernames of approved reviewers and the timestamp
-                they were requested.
-            - list: A list of tuples containing the usernames of past reviewers and the timestamp
-                they were requested.
-            - list: A list of tuples containing the usernames who requested changes and the timestamp
-                they were requested.
-            - list: A list of usernames of requested reviewers.
-            - list: A list of tuples containing the usernames of requested reviewers and the timestamp
-                they were requested.
+            - list: The Review records of the approvals.
+            - list: The Review records of the other reviews by users who never approved (past reviewers).
+            - dict: For each user who requested changes, the latest of their approving or change requesting
+                Review records, by login.
+            - list: A ReviewRequest record for each requested reviewer, with the time they were last requested.
     """
-    from datetime import datetime, timezone
-
-    headers = _get_headers(token)
-    # Get reviews
-    reviews_url = f"{GITHUB_API}/repos/{org}/{repo}/pulls/{pull_number}/reviews"
-    response = requests.get(reviews_url, headers=headers)
-    response.raise_for_status()
-    reviews = response.json()
-    approvals = [
-        review for review in reviews if review['state'] == "APPROVED"
-    ]
-    changes_requested = [
-        review for review in reviews if review['state'] == "CHANGES_REQUESTED"
-    ]
-    non_approvals = [
-        review for review in reviews if review['state'] not in ["APPROVED", "CHANGES_REQUESTED"]
-    ]
-    today = datetime.now(timezone.utc)
-    approvers = [(rv["user"]["login"].lower(), rv.get("submitted_at", today)) for rv in approvals]
-    changes_requesters = [(rv["user"]["login"].lower(), rv.get("submitted_at", today)) for rv in changes_requested]
-    non_approvers = [(rv["user"]["login"].lower(), rv.get("submitted_at", today)) for rv in non_approvals
-                     if rv["user"]["login"] not in [rv["user"]["login"].lower() for rv in approvals]]
+    # Get reviews, every page of them
+    approvers, non_approvers, changes_requesters = _summarize_reviews(
+        _iter_pr_resource("reviews", org, repo, pull_number, token))
 
     # Get requested reviewers
     requested_reviewers_usernames = get_pr_reviewers(org, repo, pull_number, token)
-    # Get PR timeline to find requested_at timestamps
-    timeline_url = f"{GITHUB_API}/repos/{org}/{repo}/issues/{pull_number}/timeline"
-    response = requests.get(timeline_url, headers=headers)
-    response.raise_for_status()
-    timeline_events = response.json()
-    requested_reviewers = []
-    for requested_reviewer in requested_reviewers_usernames:
-        requested_reviewer_tuple = (requested_reviewer.lower(), None)
-        for event in timeline_events:
-            debug_print("events. event:", event)
-            if event["event"] == "review_requested" and event.get("requested_reviewer", {}).get(
-                    "login", "").lower() == requested_reviewer:
-                if not requested_reviewer_tuple[1] or event["created_at"] > requested_reviewer_tuple[1]:
-                    requested_reviewer_tuple = (requested_reviewer.lower(), event["created_at"])
-        requested_reviewers.append(requested_reviewer_tuple)
+    # Get PR timeline to find requested_at timestamps, every page of it
+    timeline_events = _iter_pr_resource("timeline", org, repo, pull_number, token)
+    requested_reviewers = _get_review_requested_at(requested_reviewers_usernames, timeline_events)
     return approvers, non_approvers, changes_requesters, requested_reviewers
 
 
+def get_pr_approvals(org, repo, pull_number, token):
+    """
+    Fetch only the approvals of a GitHub Pull Request, without its review requests or timeline.
+
+    Args:
+        org (str): The GitHub organization or username.
+        repo (str): The GitHub repository name.
+        pull_number (int): The number of the pull request.
+        token (str): Your GitHub personal access token.
+
+    Returns:
+        list: The Review records of the approvals.
+    """
+    approvers, _, _ = _summarize_reviews(_iter_pr_resource("reviews", org, repo, pull_number, token))
+    return approvers
+
+
+def get_pr_review_events(org, repo, pull_number, token):
+    """
+    Fetch the submitted reviews of a GitHub Pull Request, each with the time its reviewer was first requested,
+    from every page of the PR's reviews and timeline.
+
+    Args:
+        org (str): The GitHub organization or username.
+        repo (str): The GitHub repository name.
+        pull_number (int): The number of the pull request.
+        token (str): Your GitHub personal access token.
+
+    Returns:
+        list: ReviewEvent records, in review order.
+    """
+    first_request_by_user = {}
+    for event in _iter_pr_resource("timeline", org, repo, pull_number, token):
+        if event["event"] != "review_requested":
+            continue
+        login = ((event.get("requested_reviewer") or {}).get("login") or "").lower()
+        if login and event["created_at"] < first_request_by_user.get(login, "9999"):
+            first_request_by_user[login] = event["created_at"]
+    review_events = []
+    for review in _iter_pr_resource("reviews", org, repo, pull_number, token):
+        # Pending reviews are not submitted yet
+        if not review.get("submitted_at"):
+            continue
+        login = review["user"]["login"].lower()
+        review_events.append(ReviewEvent(login, review["state"], parse_github_date(review["submitted_at"]),
+                                         parse_github_date(first_request_by_user.get(login))))
+    return review_events
+
+
+def _summarize_reviews(reviews):
+    """
+    Sort reviews into approvals, change requests and other reviews, in a single pass over an iterable of reviews.
+
+    Returns:
+        tuple: Review records of the approvals and of the other reviews by users who never approved, each in review
+            order, and for each user who requested changes, the latest of their approving or change requesting
+            reviews, by login.
+    """
+    from datetime import datetime, timezone
+
+    today = datetime.now(timezone.utc)
+    approvers = []
+    other_reviews = []
+    # Latest approving or change requesting review of each reviewer, which tells whether their changes are addressed
+    latest_reviews = {}
+    change_requester_logins = set()
+    for review in reviews:
+        # Pending reviews are not submitted yet
+        review = Review(review["user"]["login"].lower(), review["state"],
+                        parse_github_date(review.get("submitted_at")) or today)
+        if review.state == "APPROVED":
+            approvers.append(review)
+        elif review.state == "CHANGES_REQUESTED":
+            change_requester_logins.add(review.login)
+        else:
+            other_reviews.append(review)
+            continue
+        # Reviews do not always come in time order; an approval only addresses changes requested strictly before it
+        latest = latest_reviews.get(review.login)
+        if latest is None or review.submitted_at > latest.submitted_at or (
+                review.submitted_at == latest.submitted_at and review.state == "CHANGES_REQUESTED"):
+            latest_reviews[review.login] = review
+    approver_logins = {review.login for review in approvers}
+    non_approvers = [review for review in other_reviews if review.login not in approver_logins]
+    changes_requesters = {login: latest_reviews[login] for login in change_requester_logins}
+    return approvers, non_approvers, changes_requesters
+
+
+def _get_review_requested_at(requested_reviewers_usernames, timeline_events):
+    """
+    Return a ReviewRequest for each requested reviewer, with the time of the latest review request they got (None if
+    there is none), in a single pass over an iterable of timeline events.
+    """
+    latest_request_by_user = {}
+    for event in timeline_events:
+        if event["event"] != "review_requested":
+            continue
+        login = ((event.get("requested_reviewer") or {}).get("login") or "").lower()
+        # Timestamps of the same format compare in chronological order, only the latest ones are parsed
+        if event["created_at"] > latest_request_by_user.get(login, ""):
+            latest_request_by_user[login] = event["created_at"]
+    return [ReviewRequest(requested_reviewer.lower(),
+                          parse_github_date(latest_request_by_user.get(requested_reviewer.lower())))
+            for requested_reviewer in requested_reviewers_usernames]
+
+
 def get_pr_reviewers(org, repo, pull_number, token):
     """
-    Fetch the assigned reviewers for a GitHub Pull Request.
+    Fetch the assigned reviewers for a GitHub Pull Request, once per run.
 
     Args:
         github_api (str): The base URL for the GitHub API (e.g., 'https://api.github.com').
@@ -165,11 +471,7 @@ def get_pr_reviewers(org, repo, pull_number, token):
     Returns:
         list: A list of usernames who reviewed the pull request.
     """
-    url = f"{GITHUB_API}/repos/{org}/{repo}/pulls/{pull_number}/requested_reviewers"
-    headers = _get_headers(token)
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    reviewers = response.json()
+    reviewers = _get_pr_resource("requested_reviewers", org, repo, pull_number, token)
     return [rv["login"].lower() for rv in reviewers["users"]]
 
 
@@ -189,10 +491,144 @@ def add_reviewer(org, repo, pull_number, reviewer, token):
         dict: The response from the API.
     """
     url = f"{GITHUB_API}/repos/{org}/{repo}/pulls/{pull_number}/requested_reviewers"
-    headers = _get_headers(token)
     data = {
         "reviewers": [reviewer]
     }
-    response = requests.post(url, headers=headers, json=data)
+    # Requesting a review from someone already requested changes nothing, so the request can be retried safely
+    response = client.request(_get_session(token), "POST", url, idempotent=True, json=data)
     response.raise_for_status()
+    clear_memo(org, repo, pull_number)
     return response.json()
+
+
+OPEN_PRS_QUERY = """
+query($owner: String!, $name: String!, $cursor: String) {
+  repository(owner: $owner, name: $name) {
+    pullRequests(states: OPEN, first: 50, after: $cursor, orderBy: {field: CREATED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        number
+        url
+        title
+        isDraft
+        updatedAt
+        headRefOid
+        author { login }
+        reviews(first: 100) {
+          pageInfo { hasNextPage endCursor }
+          nodes { state submittedAt author { login } }
+        }
+        reviewRequests(first: 100) {
+          nodes { requestedReviewer { ... on User { login } } }
+        }
+        timelineItems(itemTypes: [REVIEW_REQUESTED_EVENT], last: 100) {
+          nodes { ... on ReviewRequestedEvent { createdAt requestedReviewer { ... on User { login } } } }
+        }
+      }
+    }
+  }
+}
+"""
+
+PR_REVIEWS_QUERY = """
+query($owner: String!, $name: String!, $number: Int!, $cursor: String) {
+  repository(owner: $owner, name: $name) {
+    pullRequest(number: $number) {
+      reviews(first: 100, after: $cursor) {
+        pageInfo { hasNextPage endCursor }
+        nodes { state submittedAt author { login } }
+      }
+    }
+  }
+}
+"""
+
+
+def _graphql(query, variables, token):
+    response = client.request(_get_session(token), "POST", f"{GITHUB_API}/graphql", idempotent=True,
+                              json={"query": query, "variables": variables})
+    response.raise_for_status()
+    body = response.json()
+    if body.get("errors"):
+        raise Exception(f"GraphQL query failed: {body['errors']}")
+    return body["data"]
+
+
+def _login(actor):
+    return (actor or {}).get("login") or ""
+
+
+def _graphql_review_to_rest(node):
+    review = {"user": {"login": _login(node["author"])}, "state": node["state"]}
+    if node["submittedAt"]:
+        review["submitted_at"] = node["submittedAt"]
+    return review
+
+
+def _get_remaining_reviews_graphql(org, repo, pull_number, cursor, token):
+    reviews = []
+    while cursor:
+        data = _graphql(PR_REVIEWS_QUERY, {"owner": org, "name": repo, "number": pull_number, "cursor": cursor},
+                        token)
+        page = data["repository"]["pullRequest"]["reviews"]
+        reviews.extend(_graphql_review_to_rest(node) for node in page["nodes"])
+        cursor = page["pageInfo"]["endCursor"] if page["pageInfo"]["hasNextPage"] else None
+    return reviews
+
+
+def get_ready_prs_with_reviews(org, repo, authors, token):
+    """
+    Fetch the open, non draft PRs of the given authors together with their reviews, review requests and
+    review request timestamps, using paginated GraphQL queries instead of several REST calls per PR.
+
+    Args:
+        org (str): The GitHub organization or username.
+        repo (str): The GitHub repository name.
+        authors (list): Lowercase GitHub usernames whose PRs are wanted.
+        token (str): Your GitHub personal access token.
+
+    Returns:
+        tuple: A tuple containing:
+            - list: The PRs, as the bin.records.PR records get_ready_prs_by_authors returns.
+            - dict: For each PR number, the (approvers, past_reviewers, changes_requesters, requested_reviewers)
+                tuple returned by get_pr_approvers_and_past_reviewers followed by the get_pr_reviewers list.
+    """
+    with trace.span(f"open PRs with reviews {org}/{repo}", "github"):
+        all_prs = []
+        reviews_by_pr = {}
+        cursor = None
+        has_next_page = True
+        while has_next_page:
+            data = _graphql(OPEN_PRS_QUERY, {"owner": org, "name": repo, "cursor": cursor}, token)
+            pull_requests = data["repository"]["pullRequests"]
+            for node in pull_requests["nodes"]:
+                pr = PR(
+                    number=node["number"],
+                    url=node["url"],
+                    title=node["title"],
+                    author=_login(node["author"]).lower(),
+                    draft=node["isDraft"],
+                    updated_at=parse_github_date(node.get("updatedAt")),
+                    head_sha=node.get("headRefOid"),
+                )
+                if not (_is_pr_ready_for_review(pr) and _is_pr_author_in_list(pr, authors)):
+                    continue
+                reviews = [_graphql_review_to_rest(review) for review in node["reviews"]["nodes"]]
+                if node["reviews"]["pageInfo"]["hasNextPage"]:
+                    reviews.extend(_get_remaining_reviews_graphql(org, repo, pr.number,
+                                                                  node["reviews"]["pageInfo"]["endCursor"], token))
+                reviewers = [_login(request["requestedReviewer"]).lower() for request in node["reviewRequests"]["nodes"]
+                             if _login(request["requestedReviewer"])]
+                timeline_events = [
+                    {"event": "review_requested", "requested_reviewer": {"login": _login(event["requestedReviewer"])},
+                     "created_at": event["createdAt"]}
+                    for event in node["timelineItems"]["nodes"] if event
+                ]
+                approvers, non_approvers, changes_requesters = _summarize_reviews(reviews)
+                requested_reviewers = _get_review_requested_at(reviewers, timeline_events)
+                all_prs.append(pr)
+                reviews_by_pr[pr.number] = (approvers, non_approvers, changes_requesters, requested_reviewers,
+                                            reviewers)
+            has_next_page = pull_requests["pageInfo"]["hasNextPage"]
+            cursor = pull_requests["pageInfo"]["endCursor"]
+        return all_prs, reviews_by_pr
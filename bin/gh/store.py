@@ -0,0 +1,201 @@
+import sqlite3
+from datetime import datetime
+
+DEFAULT_STORE_FILE = ".pr_approvals.sqlite"
+
+_DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# Bumped whenever the tables change; stores with an older schema are emptied and synced again
+_SCHEMA_VERSION = 3
+
+
+def _to_text(date):
+    return date.strftime(_DATE_FORMAT)
+
+
+def _from_text(text):
+    return datetime.fromisoformat(text.replace('Z', '+00:00'))
+
+
+class MergedPRStore:
+    """
+    Local SQLite store of merged PRs, their approvals and, for the review metrics, their review events.
+
+    Merged PRs never change, so once a PR is stored it is never fetched again. The store also remembers, for each
+    repository, the merge date range it holds every PR for, so a run only needs to sync the PRs merged since the
+    last one. Repositories are identified by their "org/repo" name.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_FILE):
+        self._conn = sqlite3.connect(path)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+            self._conn.executescript(
+                "DROP TABLE IF EXISTS merged_prs; DROP TABLE IF EXISTS approvals; DROP TABLE IF EXISTS sync;"
+                "DROP TABLE IF EXISTS review_events;"
+                f"PRAGMA user_version = {_SCHEMA_VERSION};"
+            )
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS merged_prs ("
+            " repo TEXT NOT NULL, number INTEGER NOT NULL, author TEXT NOT NULL, merged_at TEXT NOT NULL,"
+            " approvals_synced INTEGER NOT NULL DEFAULT 0, events_synced INTEGER NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (repo, number));"
+            "CREATE INDEX IF NOT EXISTS merged_prs_merged_at ON merged_prs (merged_at);"
+            "CREATE TABLE IF NOT EXISTS approvals ("
+            " repo TEXT NOT NULL, pr_number INTEGER NOT NULL, approver TEXT NOT NULL, count INTEGER NOT NULL,"
+            " PRIMARY KEY (repo, pr_number, approver));"
+            "CREATE TABLE IF NOT EXISTS review_events ("
+            " repo TEXT NOT NULL, pr_number INTEGER NOT NULL, reviewer TEXT NOT NULL, state TEXT NOT NULL,"
+            " requested_at TEXT, reviewed_at TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS review_events_pr ON review_events (repo, pr_number);"
+            "CREATE TABLE IF NOT EXISTS sync (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+        )
+        self._conn.commit()
+
+    def get_synced_range(self, repo):
+        """Return the (since, until) dates every PR merged in `repo` is stored for, or None if it was never synced."""
+        rows = dict(self._conn.execute("SELECT key, value FROM sync WHERE key IN (?, ?)",
+                                       (f"{repo}:since", f"{repo}:until")))
+        if f"{repo}:since" not in rows or f"{repo}:until" not in rows:
+            return None
+        return _from_text(rows[f"{repo}:since"]), _from_text(rows[f"{repo}:until"])
+
+    def set_synced_range(self, repo, since, until):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO sync (key, value) VALUES (?, ?)",
+            [(f"{repo}:since", _to_text(since)), (f"{repo}:until", _to_text(until))],
+        )
+        self._conn.commit()
+
+    def add_pr(self, repo, number, author, merged_at):
+        """
+        Store a merged PR, if it is not stored yet. Its approvals are stored separately with set_approvals.
+
+        Args:
+            repo (str): The "org/repo" name of the repository.
+            number (int): The number of the pull request.
+            author (str): Lowercase GitHub username of the author.
+            merged_at (datetime): Timezone aware merge date.
+        """
+        self._conn.execute(
+            "INSERT OR IGNORE INTO merged_prs (repo, number, author, merged_at) VALUES (?, ?, ?, ?)",
+            (repo, number, author, _to_text(merged_at)),
+        )
+        self._conn.commit()
+
+    def get_prs_missing_approvals(self, since, authors):
+        """Return the (repo, number) of the PRs by `authors` merged after `since` whose approvals are not stored yet."""
+        authors = list(authors)
+        placeholders = ", ".join("?" * len(authors))
+        rows = self._conn.execute(
+            "SELECT repo, number FROM merged_prs "
+            f"WHERE approvals_synced = 0 AND merged_at > ? AND author IN ({placeholders}) ORDER BY repo, number",
+            [_to_text(since)] + authors,
+        )
+        return rows.fetchall()
+
+    def set_approvals(self, repo, number, approvers):
+        """
+        Store the approvals of a merged PR.
+
+        Args:
+            repo (str): The "org/repo" name of the repository.
+            number (int): The number of the pull request.
+            approvers (list): Lowercase usernames, once per approving review.
+        """
+        counts = {}
+        for approver in approvers:
+            counts[approver] = counts.get(approver, 0) + 1
+        self._conn.execute("DELETE FROM approvals WHERE repo = ? AND pr_number = ?", (repo, number))
+        self._conn.executemany(
+            "INSERT INTO approvals (repo, pr_number, approver, count) VALUES (?, ?, ?, ?)",
+            [(repo, number, approver, count) for approver, count in counts.items()],
+        )
+        self._conn.execute("UPDATE merged_prs SET approvals_synced = 1 WHERE repo = ? AND number = ?",
+                           (repo, number))
+        self._conn.commit()
+
+    def get_prs_missing_review_events(self, since, authors):
+        """Return the (repo, number) of the PRs by `authors` merged after `since` whose review events are not stored
+        yet."""
+        authors = list(authors)
+        placeholders = ", ".join("?" * len(authors))
+        rows = self._conn.execute(
+            "SELECT repo, number FROM merged_prs "
+            f"WHERE events_synced = 0 AND merged_at > ? AND author IN ({placeholders}) ORDER BY repo, number",
+            [_to_text(since)] + authors,
+        )
+        return rows.fetchall()
+
+    def set_review_events(self, repo, number, review_events):
+        """
+        Store the review events of a merged PR, and its approvals, which they include.
+
+        Args:
+            repo (str): The "org/repo" name of the repository.
+            number (int): The number of the pull request.
+            review_events (list): ReviewEvent records.
+        """
+        self._conn.execute("DELETE FROM review_events WHERE repo = ? AND pr_number = ?", (repo, number))
+        self._conn.executemany(
+            "INSERT INTO review_events (repo, pr_number, reviewer, state, requested_at, reviewed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(repo, number, event.reviewer, event.state, event.requested_at and _to_text(event.requested_at),
+              _to_text(event.reviewed_at)) for event in review_events],
+        )
+        self._conn.execute("UPDATE merged_prs SET events_synced = 1 WHERE repo = ? AND number = ?", (repo, number))
+        self.set_approvals(repo, number, [event.reviewer for event in review_events if event.state == "APPROVED"])
+
+    def get_merged_prs(self, since, authors):
+        """Return the (repo, number, author, merged_at) of the PRs by `authors` merged after `since`, dates as text."""
+        authors = list(authors)
+        placeholders = ", ".join("?" * len(authors))
+        rows = self._conn.execute(
+            "SELECT repo, number, author, merged_at FROM merged_prs "
+            f"WHERE merged_at > ? AND author IN ({placeholders}) ORDER BY repo, number",
+            [_to_text(since)] + authors,
+        )
+        return rows.fetchall()
+
+    def get_review_events(self, since, authors):
+        """
+        Return the review events of the PRs by `authors` merged after `since`, ordered by PR, reviewer and time.
+
+        Returns:
+            list: (repo, number, reviewer, state, requested_at, reviewed_at) tuples, dates as text.
+        """
+        authors = list(authors)
+        placeholders = ", ".join("?" * len(authors))
+        rows = self._conn.execute(
+            "SELECT e.repo, e.pr_number, e.reviewer, e.state, e.requested_at, e.reviewed_at FROM review_events e "
+            "JOIN merged_prs p ON p.repo = e.repo AND p.number = e.pr_number "
+            f"WHERE p.merged_at > ? AND p.author IN ({placeholders}) "
+            "ORDER BY e.repo, e.pr_number, e.reviewer, e.reviewed_at",
+            [_to_text(since)] + authors,
+        )
+        return rows.fetchall()
+
+    def get_approval_stats(self, since, users):
+        """
+        Count, among the PRs authored by `users` and merged after `since` in any repository, the merged PRs and the
+        approvals given by each of `users`.
+
+        Returns:
+            tuple: The number of merged PRs and a dict of approval counts by approver.
+        """
+        users = list(users)
+        placeholders = ", ".join("?" * len(users))
+        merged_count = self._conn.execute(
+            f"SELECT COUNT(*) FROM merged_prs WHERE merged_at > ? AND author IN ({placeholders})",
+            [_to_text(since)] + users,
+        ).fetchone()[0]
+        approval_counts = dict(self._conn.execute(
+            "SELECT a.approver, SUM(a.count) FROM approvals a "
+            "JOIN merged_prs p ON p.repo = a.repo AND p.number = a.pr_number "
+            f"WHERE p.merged_at > ? AND p.author IN ({placeholders}) AND a.approver IN ({placeholders}) "
+            "GROUP BY a.approver",
+            [_to_text(since)] + users + users,
+        ))
+        return merged_count, approval_counts
+
+    def close(self):
+        self._conn.close()
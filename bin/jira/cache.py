@@ -0,0 +1,63 @@
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_FILE = ".jira_transitions.sqlite"
+# Transition IDs older than this are looked up again, in case the workflow changed
+DEFAULT_TTL = 7 * 24 * 3600
+
+
+class TransitionCache:
+    """
+    On-disk cache of JIRA transition IDs.
+
+    Every ticket of a project and issue type follows the same workflow, so the ID of the transition to a given target
+    from a given status is the same for all of them. Caching it saves the GET of the ticket's transitions before each
+    transition.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_FILE, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS transitions ("
+            " project TEXT NOT NULL, issue_type TEXT NOT NULL, status TEXT NOT NULL, target TEXT NOT NULL,"
+            " transition_id TEXT NOT NULL, stored_at REAL NOT NULL,"
+            " PRIMARY KEY (project, issue_type, status, target))"
+        )
+        self._conn.commit()
+
+    def get(self, project, issue_type, status, target):
+        """Return the cached ID of the transition to `target` from `status`, or None if unknown or expired."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT transition_id, stored_at FROM transitions "
+                "WHERE project = ? AND issue_type = ? AND status = ? AND target = ?",
+                (project, issue_type, status.lower(), target),
+            ).fetchone()
+        if not row or time.time() - row[1] > self.ttl:
+            return None
+        return row[0]
+
+    def put(self, project, issue_type, status, target, transition_id):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO transitions (project, issue_type, status, target, transition_id, stored_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (project, issue_type, status.lower(), target, transition_id, time.time()),
+            )
+            self._conn.commit()
+
+    def invalidate(self, project, issue_type, status, target):
+        """Forget a transition ID, after JIRA refused it."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM transitions WHERE project = ? AND issue_type = ? AND status = ? AND target = ?",
+                (project, issue_type, status.lower(), target),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,7 +1,35 @@
 import math
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from requests.auth import HTTPBasicAuth
+
+from bin import client, trace
+from bin.records import TicketState
+
+# Keys per JQL query and issues per search page
+SEARCH_KEYS_PER_QUERY = 100
+SEARCH_PAGE_SIZE = 100
+
+# Transitions applied in parallel by transition_tickets
+TRANSITION_CONCURRENCY = 8
+
+# Cache of transition IDs by workflow and status, a bin.jira.cache.TransitionCache, or None to look them up every time
+TRANSITION_CACHE = None
+
+# Targets of transition_ticket, and how to recognize their transition among the ones available for a ticket
+QA_REVIEW = "qa review"
+IN_PROGRESS = "in progress"
+_TRANSITION_MATCHERS = {
+    QA_REVIEW: lambda transition: transition["name"].upper() == "READY FOR QA REVIEW",
+    IN_PROGRESS: lambda transition: transition["to"]["name"].upper() == "IN PROGRESS",
+}
+_MISSING_TRANSITION_ERRORS = {
+    QA_REVIEW: "No 'Ready for QA Review' transition available for ticket {}.",
+    IN_PROGRESS: "No transition to 'In Progress' available for ticket {}.",
+}
+
+
+def _get_session(base_url, email, api_token):
+    return client.get_session(base_url, headers={"Accept": "application/json"}, auth=(email, api_token))
 
 
 def get_ticket_status(base_url, email, ticket_id, api_token):
@@ -18,12 +46,7 @@ def get_ticket_status(base_url, email, ticket_id, api_token):
         str: The status of the JIRA ticket.
     """
     url = f"{base_url}/rest/api/3/issue/{ticket_id}"
-    auth = HTTPBasicAuth(email, api_token)
-    headers = {
-        "Accept": "application/json"
-    }
-
-    response = requests.get(url, headers=headers, auth=auth)
+    response = client.request(_get_session(base_url, email, api_token), "GET", url)
 
     if response.status_code == 200:
         ticket_data = response.json()
@@ -33,7 +56,67 @@ def get_ticket_status(base_url, email, ticket_id, api_token):
         raise Exception(f"Failed to fetch ticket data. Status Code: {response.status_code}, Response: {response.text}")
 
 
-def transition_ticket_to_qa_review(base_url, email, ticket_id, api_token):
+def _get_transition_id(session, transitions_url, ticket_id, target):
+    response = client.request(session, "GET", transitions_url)
+    if response.status_code != 200:
+        raise Exception(f"Failed to fetch transitions. Status Code: {response.status_code}, Response: {response.text}")
+    transitions = response.json().get("transitions", [])
+    transition = next((t for t in transitions if _TRANSITION_MATCHERS[target](t)), None)
+    if not transition:
+        raise Exception(_MISSING_TRANSITION_ERRORS[target].format(ticket_id))
+    return transition["id"]
+
+
+def _post_transition(session, transitions_url, transition_id):
+    payload = {"transition": {"id": transition_id}}
+    return client.request(session, "POST", transitions_url, json=payload)
+
+
+def transition_ticket(base_url, email, ticket_id, api_token, target, ticket=None):
+    """
+    Transition a JIRA ticket to QA_REVIEW or IN_PROGRESS using the JIRA API.
+
+    When TRANSITION_CACHE is set and `ticket` knows the project, issue type and status of the ticket, the
+    transition ID cached for that workflow and status is posted directly, without fetching the ticket's transitions
+    first. A cached ID that JIRA refuses is forgotten and looked up again, without caching the new one.
+
+    Args:
+        base_url (str): The base URL of the JIRA instance (e.g., 'https://your-company.atlassian.net').
+        email (str): Your JIRA account email.
+        ticket_id (str): The JIRA ticket ID to transition (e.g., 'PROJ-123').
+        api_token (str): Your JIRA API token.
+        target (str): QA_REVIEW or IN_PROGRESS.
+        ticket (TicketState): The ticket as returned by get_tickets_status_and_age, if known.
+
+    Raises:
+        Exception: If the transition fails or is not a valid transition for the ticket.
+    """
+    with trace.span(f"transition {ticket_id} to {target}", "jira") as details:
+        session = _get_session(base_url, email, api_token)
+        transitions_url = f"{base_url}/rest/api/3/issue/{ticket_id}/transitions"
+        cache_key = None
+        if TRANSITION_CACHE and ticket and ticket.project and ticket.issue_type:
+            cache_key = (ticket.project, ticket.issue_type, ticket.status, target)
+            transition_id = TRANSITION_CACHE.get(*cache_key)
+            details["cached"] = bool(transition_id)
+            if transition_id:
+                if _post_transition(session, transitions_url, transition_id).status_code == 204:
+                    return True
+                TRANSITION_CACHE.invalidate(*cache_key)
+                # The ticket was most likely no longer in the status it was known in, so the ID looked up below
+                # belongs to another status and must not be cached under this one
+                cache_key = None
+        transition_id = _get_transition_id(session, transitions_url, ticket_id, target)
+        transition_response = _post_transition(session, transitions_url, transition_id)
+        if transition_response.status_code != 204:
+            raise Exception(f"Failed to transition ticket. Status Code: {transition_response.status_code}, Response: "
+                            f"{transition_response.text}")
+        if cache_key:
+            TRANSITION_CACHE.put(*cache_key, transition_id)
+        return True
+
+
+def transition_ticket_to_qa_review(base_url, email, ticket_id, api_token, ticket=None):
     """
     Transition a JIRA ticket to the 'QA REVIEW' status using the JIRA API.
 
@@ -42,35 +125,15 @@ def transition_ticket_to_qa_review(base_url, email, ticket_id, api_token):
         ticket_id (str): The JIRA ticket ID to transition (e.g., 'PROJ-123').
         email (str): Your JIRA account email.
         api_token (str): Your JIRA API token.
+        ticket (TicketState): The ticket as returned by get_tickets_status_and_age, to use a cached transition ID.
 
     Raises:
         Exception: If the transition fails or 'QA REVIEW' is not a valid transition.
     """
-    auth = HTTPBasicAuth(email, api_token)
-    headers = {
-        "Accept": "application/json",
-        "Content-Type": "application/json"
-    }
-    # Get available transitions
-    transitions_url = f"{base_url}/rest/api/3/issue/{ticket_id}/transitions"
-    response = requests.get(transitions_url, headers=headers, auth=auth)
-    if response.status_code != 200:
-        raise Exception(f"Failed to fetch transitions. Status Code: {response.status_code}, Response: {response.text}")
-    transitions = response.json().get("transitions", [])
-    qa_review_transition = next((t for t in transitions if t["name"].upper() == "READY FOR QA REVIEW"), None)
-    if not qa_review_transition:
-        raise Exception(f"No 'Ready for QA Review' transition available for ticket {ticket_id}.")
-    transition_id = qa_review_transition["id"]
-    # Perform the transition
-    payload = {"transition": {"id": transition_id}}
-    transition_response = requests.post(transitions_url, headers=headers, auth=auth, json=payload)
-    if transition_response.status_code != 204:
-        raise Exception(f"Failed to transition ticket. Status Code: {transition_response.status_code}, Response: "
-                        f"{transition_response.text}")
-    return True
+    return transition_ticket(base_url, email, ticket_id, api_token, QA_REVIEW, ticket)
 
 
-def transition_ticket_to_in_progress(base_url, email, ticket_id, api_token):
+def transition_ticket_to_in_progress(base_url, email, ticket_id, api_token, ticket=None):
     """
     Transition a JIRA ticket to the 'In Progress' status using the JIRA API.
 
@@ -79,30 +142,53 @@ def transition_ticket_to_in_progress(base_url, email, ticket_id, api_token):
         ticket_id (str): The JIRA ticket ID to transition (e.g., 'PROJ-123').
         email (str): Your JIRA account email.
         api_token (str): Your JIRA API token.
+        ticket (TicketState): The ticket as returned by get_tickets_status_and_age, to use a cached transition ID.
 
     Raises:
         Exception: If the transition fails or 'In Progress' is not a valid transition.
     """
-    auth = HTTPBasicAuth(email, api_token)
-    headers = {
-        "Accept": "application/json",
-        "Content-Type": "application/json"
-    }
-    transitions_url = f"{base_url}/rest/api/3/issue/{ticket_id}/transitions"
-    response = requests.get(transitions_url, headers=headers, auth=auth)
-    if response.status_code != 200:
-        raise Exception(f"Failed to fetch transitions. Status Code: {response.status_code}, Response: {response.text}")
-    transitions = response.json().get("transitions", [])
-    in_progress_transition = next((t for t in transitions if t["to"]["name"].upper() == "IN PROGRESS"), None)
-    if not in_progress_transition:
-        raise Exception(f"No transition to 'In Progress' available for ticket {ticket_id}.")
-    transition_id = in_progress_transition["id"]
-    payload = {"transition": {"id": transition_id}}
-    transition_response = requests.post(transitions_url, headers=headers, auth=auth, json=payload)
-    if transition_response.status_code != 204:
-        raise Exception(f"Failed to transition ticket. Status Code: {transition_response.status_code}, Response: "
-                        f"{transition_response.text}")
-    return True
+    return transition_ticket(base_url, email, ticket_id, api_token, IN_PROGRESS, ticket)
+
+
+def transition_tickets(base_url, email, transitions, api_token, tickets=None, concurrency=TRANSITION_CONCURRENCY):
+    """
+    Apply many transitions concurrently.
+
+    The first transition of each workflow and status runs before the others, so with TRANSITION_CACHE set the
+    others reuse the transition ID it looked up and only cost their POST.
+
+    Args:
+        base_url (str): The base URL of the JIRA instance (e.g., 'https://your-company.atlassian.net').
+        email (str): Your JIRA account email.
+        transitions (list): (ticket_id, target) tuples, target being QA_REVIEW or IN_PROGRESS.
+        api_token (str): Your JIRA API token.
+        tickets (dict): The tickets as returned by get_tickets_status_and_age.
+        concurrency (int): Number of transitions applied in parallel.
+
+    Returns:
+        dict: The exception raised for each ticket ID whose transition failed, empty if all of them succeeded.
+    """
+    tickets = tickets or {}
+    first, rest = [], []
+    workflows = set()
+    for ticket_id, target in transitions:
+        ticket = tickets.get(ticket_id) or TicketState(ticket_id, "", 0)
+        workflow = (ticket.project, ticket.issue_type, ticket.status.lower(), target)
+        (rest if workflow in workflows else first).append((ticket_id, target))
+        workflows.add(workflow)
+    errors = {}
+
+    def apply(transition):
+        ticket_id, target = transition
+        try:
+            transition_ticket(base_url, email, ticket_id, api_token, target, tickets.get(ticket_id))
+        except Exception as e:
+            errors[ticket_id] = e
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        list(executor.map(apply, first))
+        list(executor.map(apply, rest))
+    return errors
 
 
 def get_ticket_age_in_current_status(base_url, email, ticket_id, api_token):
@@ -119,20 +205,20 @@ def get_ticket_age_in_current_status(base_url, email, ticket_id, api_token):
         list: A list of dictionaries containing status transition details.
               Each dictionary includes 'from', 'to', 'date', and 'days_in_status'.
     """
-    auth = HTTPBasicAuth(email, api_token)
-    headers = {
-        "Accept": "application/json"
-    }
     url = f"{base_url}/rest/api/3/issue/{ticket_id}?expand=changelog"
-    response = requests.get(url, headers=headers, auth=auth)
+    response = client.request(_get_session(base_url, email, api_token), "GET", url)
     if response.status_code != 200:
         raise Exception(f"Failed to fetch ticket data. Status Code: {response.status_code}, Response: {response.text}")
 
     ticket_data = response.json()
     changelog = ticket_data.get('changelog', {}).get('histories', [])
+    return _days_since(_get_status_start_date(ticket_data['fields']['created'], changelog))
+
 
+def _get_status_start_date(created, changelog):
+    """Return the date a ticket entered its current status: its last status change in `changelog`, or `created`."""
     status_transitions = []
-    last_status_change_date = datetime.strptime(ticket_data['fields']['created'], '%Y-%m-%dT%H:%M:%S.%f%z')
+    last_status_change_date = datetime.strptime(created, '%Y-%m-%dT%H:%M:%S.%f%z')
     # Collect all status transitions
     for change in changelog:
         for item in change['items']:
@@ -148,8 +234,74 @@ def get_ticket_age_in_current_status(base_url, email, ticket_id, api_token):
                 })
     # Sort transitions by date
     status_transitions.sort(key=lambda x: x['date'])
-    # Calculate days in current status from last transition to today
-    current_status_start_date = status_transitions[-1]['date'] if status_transitions else last_status_change_date
-    time_in_current_status = datetime.now(current_status_start_date.tzinfo) - current_status_start_date
-    days_in_current_status = math.ceil(float(time_in_current_status.total_seconds() / 3600) / 24.0) - 1
-    return days_in_current_status
+    return status_transitions[-1]['date'] if status_transitions else last_status_change_date
+
+
+def _days_since(date):
+    elapsed = datetime.now(date.tzinfo) - date
+    return math.ceil(float(elapsed.total_seconds() / 3600) / 24.0) - 1
+
+
+def get_tickets_status_and_age(base_url, email, ticket_ids, api_token):
+    """
+    Fetch the status and the days spent in it for many JIRA tickets at once, using paginated JQL searches
+    (`key in (...)`) instead of one issue and one changelog request per ticket.
+
+    The age is computed from the last status change of the changelog each search result is expanded with, as
+    get_ticket_age_in_current_status does, and not from `statuscategorychangedate`: Code Review, In Review and
+    In Progress usually share a status category, so that date would count from when work on the ticket started. The
+    few tickets whose changelog is too long to be returned whole are looked up one by one.
+
+    Args:
+        base_url (str): The base URL of the JIRA instance (e.g., 'https://your-company.atlassian.net').
+        email (str): Your JIRA account email.
+        ticket_ids (iterable): The JIRA ticket IDs to look up (e.g., ['PROJ-123', 'PROJ-124']).
+        api_token (str): Your JIRA API token.
+
+    Returns:
+        dict: A TicketState record for each ticket ID found. Tickets that do not exist are left out.
+    """
+    with trace.span("search tickets", "jira") as details:
+        session = _get_session(base_url, email, api_token)
+        url = f"{base_url}/rest/api/3/search"
+        ticket_ids = sorted(set(ticket_ids))
+        details["tickets"] = len(ticket_ids)
+        tickets = {}
+        for i in range(0, len(ticket_ids), SEARCH_KEYS_PER_QUERY):
+            keys = ticket_ids[i:i + SEARCH_KEYS_PER_QUERY]
+            payload = {
+                "jql": f"key in ({', '.join(keys)})",
+                "fields": ["status", "created", "project", "issuetype"],
+                "expand": ["changelog"],
+                "maxResults": SEARCH_PAGE_SIZE,
+                "startAt": 0,
+                # Unknown keys are reported as warnings instead of failing the whole query
+                "validateQuery": "warn",
+            }
+            while True:
+                response = client.request(session, "POST", url, idempotent=True, json=payload)
+                if response.status_code != 200:
+                    raise Exception(f"Failed to search tickets. Status Code: {response.status_code}, "
+                                    f"Response: {response.text}")
+                result = response.json()
+                issues = result.get("issues", [])
+                for issue in issues:
+                    fields = issue["fields"]
+                    changelog = issue.get("changelog") or {}
+                    histories = changelog.get("histories", [])
+                    if changelog.get("total", len(histories)) > len(histories):
+                        # Truncated, the last status change may be missing
+                        days_in_status = get_ticket_age_in_current_status(base_url, email, issue["key"], api_token)
+                    else:
+                        days_in_status = _days_since(_get_status_start_date(fields["created"], histories))
+                    tickets[issue["key"]] = TicketState(
+                        key=issue["key"],
+                        status=fields["status"]["name"],
+                        days_in_status=days_in_status,
+                        project=(fields.get("project") or {}).get("key"),
+                        issue_type=(fields.get("issuetype") or {}).get("name"),
+                    )
+                payload["startAt"] += len(issues)
+                if not issues or payload["startAt"] >= result.get("total", 0):
+                    break
+        return tickets
@@ -0,0 +1,65 @@
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+DEFAULT_LEDGER_FILE = ".pr_ledger.sqlite"
+# Entries of PRs not seen for this long (closed, merged...) are deleted
+DEFAULT_TTL = 30 * 24 * 3600
+
+LedgerEntry = namedtuple("LedgerEntry", ["fingerprint", "decision", "reviewer"])
+
+
+class PRLedger:
+    """
+    On-disk record of the decision taken for each open PR, with a fingerprint of everything it was taken from.
+
+    A PR whose fingerprint did not change since the last run gets the same decision, so its reviews, timeline and
+    ticket history do not need to be fetched again.
+    """
+
+    def __init__(self, path=DEFAULT_LEDGER_FILE, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS decisions ("
+            " repo TEXT NOT NULL, number INTEGER NOT NULL, fingerprint TEXT NOT NULL, decision TEXT NOT NULL,"
+            " reviewer TEXT, seen_at REAL NOT NULL, PRIMARY KEY (repo, number))"
+        )
+        self._conn.commit()
+
+    def get(self, repo, number):
+        """Return the LedgerEntry of a PR of an "org/repo" repository, or None if none was recorded."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, decision, reviewer FROM decisions WHERE repo = ? AND number = ?", (repo, number)
+            ).fetchone()
+        return LedgerEntry(*row) if row else None
+
+    def record(self, entries):
+        """
+        Record the decisions of a run in one transaction, and delete the entries of PRs not seen for too long.
+
+        Args:
+            entries (list): (repo, number, fingerprint, decision, reviewer) tuples. A None decision deletes the entry
+                of the PR, so its next run decides again from scratch.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO decisions (repo, number, fingerprint, decision, reviewer, seen_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(repo, number, fingerprint, decision, reviewer, now)
+                 for repo, number, fingerprint, decision, reviewer in entries if decision is not None],
+            )
+            self._conn.executemany(
+                "DELETE FROM decisions WHERE repo = ? AND number = ?",
+                [(repo, number) for repo, number, _, decision, _ in entries if decision is None],
+            )
+            self._conn.execute("DELETE FROM decisions WHERE seen_at < ?", (now - self.ttl,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
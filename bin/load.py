@@ -0,0 +1,115 @@
+import random
+import sqlite3
+import time
+
+DEFAULT_LOAD_FILE = ".reviewer_load.sqlite"
+# Loads of runs started longer ago than this are deleted
+RUN_TTL = 24 * 3600
+# How long a shard waits for the other shards to count their reviewers before picking new ones anyway
+BARRIER_TIMEOUT = 120
+# How long a shard still waits for the other shards once the deadline of the run passed, they finish the PRs they
+# started too
+BARRIER_GRACE = 10
+BARRIER_POLL_INTERVAL = 0.2
+
+
+class ReviewerLoad:
+    """
+    Reviewer load of a sharded run, shared by the processes handling its shards through a SQLite file.
+
+    Each shard first counts the reviewers of its own PRs, then waits for every shard of the run to be done counting
+    before picking reviewers for the PRs that need one, so picks see the load of the whole run as they would in a
+    single process. Every update is one transaction holding the write lock of the file, so two shards never pick from
+    the same loads.
+    """
+
+    def __init__(self, run_id, shard, shards, path=DEFAULT_LOAD_FILE, rng=random):
+        self.run_id = run_id
+        self.shard = shard
+        self.shards = shards
+        self._rng = rng
+        # Transactions are explicit, the other statements commit on their own
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS loads ("
+            " run_id TEXT NOT NULL, user TEXT NOT NULL, count INTEGER NOT NULL, PRIMARY KEY (run_id, user));"
+            "CREATE TABLE IF NOT EXISTS shards ("
+            " run_id TEXT NOT NULL, shard INTEGER NOT NULL, started_at REAL NOT NULL, counted INTEGER NOT NULL,"
+            " PRIMARY KEY (run_id, shard));"
+        )
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                "DELETE FROM loads WHERE run_id IN ("
+                " SELECT run_id FROM shards GROUP BY run_id HAVING MAX(started_at) < ?)", (now - RUN_TTL,))
+            self._conn.execute("DELETE FROM shards WHERE started_at < ?", (now - RUN_TTL,))
+            self._conn.execute("INSERT OR REPLACE INTO shards (run_id, shard, started_at, counted) VALUES (?, ?, ?, 0)",
+                               (run_id, shard, now))
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def add(self, user):
+        """Count one more PR for a reviewer, e.g. one already requested on a PR of this shard."""
+        self._conn.execute(
+            "INSERT INTO loads (run_id, user, count) VALUES (?, ?, 1) "
+            "ON CONFLICT (run_id, user) DO UPDATE SET count = count + 1",
+            (self.run_id, user),
+        )
+
+    def mark_counted(self):
+        """Tell the other shards this one counted the reviewers of all its PRs."""
+        self._conn.execute("UPDATE shards SET counted = 1 WHERE run_id = ? AND shard = ?", (self.run_id, self.shard))
+
+    def wait_for_shards(self, timeout=BARRIER_TIMEOUT):
+        """
+        Wait until every shard of the run counted the reviewers of its PRs.
+
+        Returns:
+            bool: False if some shards were still counting after `timeout` seconds, e.g. because they crashed.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            counted = self._conn.execute("SELECT COUNT(*) FROM shards WHERE run_id = ? AND counted = 1",
+                                         (self.run_id,)).fetchone()[0]
+            if counted >= self.shards:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(BARRIER_POLL_INTERVAL)
+
+    def pick(self, exclude=None, users=()):
+        """
+        Atomically assign a PR to the least loaded of `users` other than `exclude`, ties broken at random.
+
+        Returns:
+            str: The reviewer, whose load is incremented, or None if there is nobody else to pick.
+        """
+        candidates = sorted(user for user in users if user != exclude)
+        if not candidates:
+            return None
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            placeholders = ", ".join("?" * len(candidates))
+            loads = dict(self._conn.execute(
+                f"SELECT user, count FROM loads WHERE run_id = ? AND user IN ({placeholders})",
+                [self.run_id] + candidates,
+            ))
+            lowest = min(loads.get(user, 0) for user in candidates)
+            reviewer = self._rng.choice([user for user in candidates if loads.get(user, 0) == lowest])
+            self.add(reviewer)
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return reviewer
+
+    def get_loads(self):
+        """Return the number of PRs of each reviewer in the run, over every shard."""
+        return dict(self._conn.execute("SELECT user, count FROM loads WHERE run_id = ?", (self.run_id,)))
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,188 @@
+import math
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import datetime
+
+# Percentiles of the review times reported for each reviewer and window
+PERCENTILES = (50, 90)
+
+_NAN = float("nan")
+_DAY = 24 * 3600
+
+
+def _timestamp(text):
+    return datetime.fromisoformat(text.replace('Z', '+00:00')).timestamp() if text else _NAN
+
+
+class ReviewColumns:
+    """
+    Review events of merged PRs held column by column in typed arrays, one entry per event in each column, rather
+    than as one object per event.
+
+    Usernames are interned as indexes into `users`, and times are seconds since the epoch, NaN when unknown. A pass
+    over the columns only reads numbers, so the metrics of thousands of PRs over several windows are computed in a
+    single pass without building an object per event.
+    """
+
+    def __init__(self):
+        self.users = []
+        self._user_indexes = {}
+        # One entry per merged PR
+        self.pr_author = array("i")
+        self.pr_merged_at = array("d")
+        # One entry per review event
+        self.pr = array("i")
+        self.reviewer = array("i")
+        self.approved = array("b")
+        # Whether the event is the first review, and the first approval, of its reviewer on the PR
+        self.first_review = array("b")
+        self.first_approval = array("b")
+        self.requested_at = array("d")
+        self.reviewed_at = array("d")
+
+    def __len__(self):
+        return len(self.reviewer)
+
+    def user_index(self, login):
+        index = self._user_indexes.get(login)
+        if index is None:
+            index = self._user_indexes[login] = len(self.users)
+            self.users.append(login)
+        return index
+
+    @classmethod
+    def from_store(cls, merged_prs, review_events):
+        """
+        Build the columns from rows of a MergedPRStore.
+
+        Args:
+            merged_prs (list): (repo, number, author, merged_at) rows, as returned by get_merged_prs.
+            review_events (list): (repo, number, reviewer, state, requested_at, reviewed_at) rows ordered by PR,
+                reviewer and time, as returned by get_review_events. Events of PRs not in `merged_prs` are skipped.
+        """
+        columns = cls()
+        pr_indexes = {}
+        for repo, number, author, merged_at in merged_prs:
+            pr_indexes[(repo, number)] = len(columns.pr_author)
+            columns.pr_author.append(columns.user_index(author))
+            columns.pr_merged_at.append(_timestamp(merged_at))
+        last_key = None
+        approved_keys = set()
+        for repo, number, reviewer, state, requested_at, reviewed_at in review_events:
+            pr_index = pr_indexes.get((repo, number))
+            if pr_index is None:
+                continue
+            key = (pr_index, reviewer)
+            approved = state == "APPROVED"
+            columns.pr.append(pr_index)
+            columns.reviewer.append(columns.user_index(reviewer))
+            columns.approved.append(approved)
+            columns.first_review.append(key != last_key)
+            columns.first_approval.append(approved and key not in approved_keys)
+            columns.requested_at.append(_timestamp(requested_at))
+            columns.reviewed_at.append(_timestamp(reviewed_at))
+            last_key = key
+            if approved:
+                approved_keys.add(key)
+        return columns
+
+
+@dataclass
+class WindowMetrics:
+    """Review metrics of the PRs merged in the last `days` days, by reviewer login."""
+
+    days: int
+    merged_prs: int = 0
+    # Approving reviews, and PRs reviewed, by reviewer
+    approvals: dict = field(default_factory=dict)
+    reviews: dict = field(default_factory=dict)
+    # Seconds from the first review request to the first review, and to the first approval, by reviewer, sorted
+    time_to_first_review: dict = field(default_factory=dict)
+    time_to_approve: dict = field(default_factory=dict)
+    # PRs reviewed by (author, reviewer)
+    matrix: dict = field(default_factory=dict)
+
+
+def percentile(sorted_values, percent):
+    """Return the nearest-rank percentile of a sorted list, or None if it is empty."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(percent / 100 * len(sorted_values)) - 1)]
+
+
+def compute_windows(columns, windows, now, users=None):
+    """
+    Compute the review metrics of several windows in one pass over the columns.
+
+    Each PR falls in the smallest window it was merged in, and its events are accumulated in that window's bucket
+    only. Since the windows are nested, each window is then the sum of its bucket and the buckets of the smaller
+    windows.
+
+    Args:
+        columns (ReviewColumns): The review events.
+        windows (list): Window lengths in days.
+        now (float): Seconds since the epoch the windows end at.
+        users (iterable): Lowercase logins of the authors and reviewers to report on, everyone if None.
+
+    Returns:
+        list: WindowMetrics instances, by increasing window length.
+    """
+    windows = sorted(set(windows))
+    limits = [days * _DAY for days in windows]
+    user_indexes = None
+    if users is not None:
+        user_indexes = {columns._user_indexes[user] for user in users if user in columns._user_indexes}
+    # Bucket of each PR, len(windows) for PRs outside every window or not by `users`
+    pr_bucket = array("i")
+    buckets = [WindowMetrics(days) for days in windows]
+    for author, merged_at in zip(columns.pr_author, columns.pr_merged_at):
+        bucket = bisect_left(limits, now - merged_at)
+        if user_indexes is not None and author not in user_indexes:
+            bucket = len(windows)
+        pr_bucket.append(bucket)
+        if bucket < len(windows):
+            buckets[bucket].merged_prs += 1
+
+    users_list = columns.users
+    for pr, reviewer, approved, first_review, first_approval, requested_at, reviewed_at in zip(
+            columns.pr, columns.reviewer, columns.approved, columns.first_review, columns.first_approval,
+            columns.requested_at, columns.reviewed_at):
+        bucket = pr_bucket[pr]
+        if bucket == len(windows) or (user_indexes is not None and reviewer not in user_indexes):
+            continue
+        metrics = buckets[bucket]
+        login = users_list[reviewer]
+        # Times are only known when the reviewer was requested before reviewing; NaN compares False
+        wait = reviewed_at - requested_at
+        if approved:
+            metrics.approvals[login] = metrics.approvals.get(login, 0) + 1
+            if first_approval and wait >= 0:
+                metrics.time_to_approve.setdefault(login, []).append(wait)
+        if first_review:
+            metrics.reviews[login] = metrics.reviews.get(login, 0) + 1
+            key = (users_list[columns.pr_author[pr]], login)
+            metrics.matrix[key] = metrics.matrix.get(key, 0) + 1
+            if wait >= 0:
+                metrics.time_to_first_review.setdefault(login, []).append(wait)
+
+    results = []
+    total = WindowMetrics(0)
+    for metrics in buckets:
+        total.days = metrics.days
+        total.merged_prs += metrics.merged_prs
+        for name in ("approvals", "reviews", "matrix"):
+            counts = getattr(total, name)
+            for key, count in getattr(metrics, name).items():
+                counts[key] = counts.get(key, 0) + count
+        for name in ("time_to_first_review", "time_to_approve"):
+            values = getattr(total, name)
+            for key, waits in getattr(metrics, name).items():
+                values.setdefault(key, []).extend(waits)
+        results.append(WindowMetrics(
+            total.days, total.merged_prs, dict(total.approvals), dict(total.reviews),
+            {key: sorted(waits) for key, waits in total.time_to_first_review.items()},
+            {key: sorted(waits) for key, waits in total.time_to_approve.items()},
+            dict(total.matrix),
+        ))
+    return results
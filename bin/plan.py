@@ -0,0 +1,100 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from bin import trace
+
+# Kinds of actions
+ASSIGN = "assign"
+TRANSITION = "transition"
+
+# Rounds of retries of the actions that failed, and delay before the first one, doubled at each round
+APPLY_RETRIES = 2
+RETRY_DELAY = 1
+
+
+@dataclass(slots=True, frozen=True)
+class Action:
+    """A write decided while planning: a reviewer to request on a PR, or a ticket to transition."""
+
+    kind: str
+    # (org, repo, number) of the PR the action is about
+    pr: tuple
+    reviewer: str = None
+    ticket: str = None
+    target: str = None
+
+    @property
+    def key(self):
+        """Actions with the same key have the same effect, e.g. two PRs moving the same ticket to QA."""
+        if self.kind == TRANSITION:
+            return self.kind, self.ticket, self.target
+        return self.kind, self.pr, self.reviewer
+
+    def describe(self):
+        org, repo, number = self.pr
+        if self.kind == TRANSITION:
+            return f"move {self.ticket} to '{self.target}' ({org}/{repo}#{number})"
+        return f"request a review from {self.reviewer} on {org}/{repo}#{number}"
+
+
+def deduplicate(actions):
+    """Return the actions in order, without the ones having the same effect as an earlier one."""
+    unique = {}
+    for action in actions:
+        unique.setdefault(action.key, action)
+    return list(unique.values())
+
+
+def print_plan(actions, file=None):
+    print(f"\nPlan: {len(actions)} action{'s' if len(actions) != 1 else ''}, not applied", file=file)
+    for action in actions:
+        print(f"  - {action.describe()}", file=file)
+
+
+def apply_plan(actions, appliers, checks=None, retries=APPLY_RETRIES):
+    """
+    Apply a plan, all the actions of each kind in one batch and the batches of the different kinds concurrently.
+
+    Actions that fail are retried up to `retries` times. Before retrying one, its check tells whether it took effect
+    anyway (e.g. a request that timed out after the server applied it), so nothing is applied twice.
+
+    Args:
+        actions (list): Action instances, duplicates are applied once.
+        appliers (dict): For each kind, a function applying a list of actions of that kind, concurrently if it can,
+            and returning the exception raised for each action that failed.
+        checks (dict): For each kind, a function telling whether an action is already applied.
+        retries (int): Rounds of retries of the failed actions.
+
+    Returns:
+        dict: The exception of each action that could not be applied, empty when the whole plan was applied.
+    """
+    checks = checks or {}
+    pending = deduplicate(actions)
+    errors = {}
+    for attempt in range(retries + 1):
+        by_kind = {}
+        for action in pending:
+            by_kind.setdefault(action.kind, []).append(action)
+        if not by_kind:
+            break
+        with trace.span("apply plan", "run", actions=len(pending), attempt=attempt):
+            with ThreadPoolExecutor(max_workers=len(by_kind)) as executor:
+                results = list(executor.map(lambda kind: appliers[kind](by_kind[kind]), by_kind))
+        errors = {action: error for result in results for action, error in result.items()}
+        if not errors or attempt == retries:
+            break
+        time.sleep(RETRY_DELAY * 2 ** attempt)
+        pending = [action for action in errors if not _is_applied(action, checks)]
+        errors = {action: errors[action] for action in pending}
+    return errors
+
+
+def _is_applied(action, checks):
+    check = checks.get(action.kind)
+    if not check:
+        return False
+    try:
+        return check(action)
+    except Exception:
+        return False
@@ -0,0 +1,78 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+
+def parse_github_date(text):
+    """Parse a GitHub timestamp (e.g. '2024-01-31T12:00:00Z') into a timezone aware datetime, None stays None."""
+    if not text:
+        return None
+    return datetime.fromisoformat(text.replace('Z', '+00:00'))
+
+
+@dataclass(slots=True, frozen=True)
+class PR:
+    """The fields of a GitHub pull request used by the scripts, without the rest of the API payload."""
+
+    number: int
+    url: str
+    title: str
+    # Lowercase GitHub username
+    author: str
+    draft: bool = False
+    state: str = "open"
+    updated_at: datetime = None
+    merged_at: datetime = None
+    head_sha: str = None
+
+    @classmethod
+    def from_github(cls, pr):
+        """Build a PR from a pull request (or search result) dict of the GitHub REST API or of a webhook."""
+        merged_at = pr.get("merged_at") or (pr.get("pull_request") or {}).get("merged_at")
+        return cls(
+            number=pr["number"],
+            url=pr.get("html_url"),
+            title=pr.get("title") or "",
+            author=((pr.get("user") or {}).get("login") or "").lower(),
+            draft=bool(pr.get("draft")),
+            state=pr.get("state") or "open",
+            updated_at=parse_github_date(pr.get("updated_at")),
+            merged_at=parse_github_date(merged_at),
+            head_sha=(pr.get("head") or {}).get("sha"),
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class Review:
+    # Lowercase GitHub username
+    login: str
+    # APPROVED, CHANGES_REQUESTED, COMMENTED...
+    state: str
+    submitted_at: datetime
+
+
+@dataclass(slots=True, frozen=True)
+class ReviewEvent:
+    # Lowercase GitHub username
+    reviewer: str
+    # APPROVED, CHANGES_REQUESTED, COMMENTED...
+    state: str
+    reviewed_at: datetime
+    # Time of the first review request the reviewer got on the PR, None if they were never requested
+    requested_at: datetime
+
+
+@dataclass(slots=True, frozen=True)
+class ReviewRequest:
+    # Lowercase GitHub username
+    login: str
+    # Time of the latest review request, None if it is not in the PR timeline
+    requested_at: datetime
+
+
+@dataclass(slots=True, frozen=True)
+class TicketState:
+    key: str
+    status: str
+    days_in_status: int
+    project: str = None
+    issue_type: str = None
@@ -0,0 +1,85 @@
+import heapq
+import random
+
+
+class ReviewerPool:
+    """
+    Picks the least loaded reviewer in O(log n), using min-heaps keyed by the number of PRs each reviewer has.
+
+    Ties between reviewers with the same load are broken at random. The pool updates the `assigned_prs_per_user`
+    dict it is built from in place, so reviewer load stays visible to the rest of the run. Picks can be restricted to
+    a team; a reviewer in several teams has a single load, shared by all of them.
+    """
+
+    def __init__(self, assigned_prs_per_user, rng=random):
+        self.assigned_prs_per_user = assigned_prs_per_user
+        self._rng = rng
+        # One heap per set of users picks are restricted to, None standing for every user
+        self._heaps = {}
+
+    def _get_heap(self, users):
+        key = frozenset(users) if users is not None else None
+        heap = self._heaps.get(key)
+        if heap is None:
+            for user in key or ():
+                self.assigned_prs_per_user.setdefault(user, 0)
+            # Sorted, so that runs with the same random seed pick the same reviewers
+            heap = [(self.assigned_prs_per_user[user], self._rng.random(), user)
+                    for user in sorted(key if key is not None else self.assigned_prs_per_user)]
+            heapq.heapify(heap)
+            self._heaps[key] = heap
+        return heap
+
+    def add(self, user):
+        """Count one more PR for a reviewer assigned outside of the pool."""
+        self.assigned_prs_per_user[user] = self.assigned_prs_per_user.get(user, 0) + 1
+        for key, heap in self._heaps.items():
+            if key is None or user in key:
+                heapq.heappush(heap, (self.assigned_prs_per_user[user], self._rng.random(), user))
+
+    def pick(self, exclude=None, users=None):
+        """
+        Assign a PR to the least loaded reviewer other than `exclude` (usually the PR author).
+
+        Args:
+            exclude (str): User who must not be picked.
+            users (iterable): Users to pick from, every user of the pool when None.
+
+        Returns:
+            str: The reviewer, whose load is incremented, or None if there is nobody else to pick.
+        """
+        heap = self._get_heap(users)
+        skipped = []
+        reviewer = None
+        while heap:
+            entry = heapq.heappop(heap)
+            count, _, user = entry
+            if count != self.assigned_prs_per_user.get(user):
+                # Outdated entry, the user was pushed again with their current load
+                continue
+            if user == exclude:
+                skipped.append(entry)
+                continue
+            reviewer = user
+            break
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        if reviewer:
+            self.add(reviewer)
+        return reviewer
+
+    def assign_batch(self, prs, teammates=None):
+        """
+        Assign a batch of PRs in one pass, each to the least loaded reviewer who is not its author.
+
+        Args:
+            prs (list): (pr_key, pr_author) tuples, in the order to assign them.
+            teammates (dict): When set, the users each author's PRs can be assigned to.
+
+        Returns:
+            dict: The reviewer picked for each PR key, or None when there was nobody to pick.
+        """
+        return {
+            pr_key: self.pick(exclude=pr_author, users=teammates[pr_author] if teammates is not None else None)
+            for pr_key, pr_author in prs
+        }
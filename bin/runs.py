@@ -0,0 +1,105 @@
+import fcntl
+import json
+import os
+import time
+
+DEFAULT_LOCK_FILE = ".assignees.lock"
+
+
+class Deadline:
+    """Time budget of a run, counted from its creation."""
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+
+class RunLock:
+    """
+    Exclusive lock on a file, held for the whole run so that a run started while another one is still going, e.g. by
+    cron, does not process the same PRs twice. The lock is released by the operating system if the run dies.
+    """
+
+    def __init__(self, path=DEFAULT_LOCK_FILE):
+        self.path = path
+        self._file = None
+
+    def acquire(self):
+        """
+        Take the lock without waiting.
+
+        Returns:
+            bool: False if another run holds it.
+        """
+        file = open(self.path, "a+")
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            file.close()
+            return False
+        file.seek(0)
+        file.truncate()
+        file.write(f"{os.getpid()}\n")
+        file.flush()
+        self._file = file
+        return True
+
+    def release(self):
+        if self._file:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+class Checkpoint:
+    """
+    JSON file of the PRs processed in the current cycle, with the reviewer counted for each one.
+
+    A run stopped before the end (deadline, crash) leaves the PRs it did not get to out of the checkpoint, and the next
+    run only processes those. PRs that failed are recorded as well, without a reviewer, so that they do not hold the
+    cycle open. Once every open PR has been processed, a new cycle starts with all of them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._reviewer_by_pr = {}
+        try:
+            with open(path, "r") as file:
+                self._reviewer_by_pr = json.load(file).get("prs", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Ignoring the unreadable checkpoint '{path}'. Details: {e}")
+
+    @staticmethod
+    def key(org, repo, number):
+        return f"{org}/{repo}#{number}"
+
+    def start(self, keys):
+        """
+        Start a run over the open PRs identified by `keys`.
+
+        Returns:
+            dict: The reviewer counted (or None) for each of `keys` already processed in the current cycle, empty when
+                a new cycle starts.
+        """
+        processed = {key: self._reviewer_by_pr[key] for key in keys if key in self._reviewer_by_pr}
+        if len(processed) == len(set(keys)):
+            # Every open PR was processed, start over; closed PRs are forgotten on the way
+            self._reviewer_by_pr = {}
+            return {}
+        return processed
+
+    def add(self, reviewer_by_pr):
+        """Record PRs as processed, with their reviewer or None, and save the file."""
+        self._reviewer_by_pr.update(reviewer_by_pr)
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump({"prs": self._reviewer_by_pr}, file)
+        # Replaced in one step, so a run killed while saving leaves the previous checkpoint intact
+        os.replace(temporary_path, self.path)
@@ -0,0 +1,168 @@
+import json
+import threading
+from dataclasses import dataclass
+
+CONFIG_FILE = "config.json"
+
+# Everything below is loaded on first use, once, and can be replaced with configure()
+_lock = threading.RLock()
+_config_file = CONFIG_FILE
+_config = None
+# Slack usernames by GitHub username, by authors file
+_authors = {}
+# Tokens and token files, by service ("github" or "jira")
+_tokens = {}
+_token_files = {}
+_SERVICE_NAMES = {"github": "GitHub", "jira": "JIRA"}
+
+
+class SettingsError(Exception):
+    """The config file, an authors file or a token file is missing or invalid."""
+
+
+@dataclass(frozen=True)
+class JiraSettings:
+    base_url: str
+    email: str
+    token: str
+    ticket_number_regex: str
+
+
+def configure(config=None, config_file=None, authors=None, tokens=None, token_files=None):
+    """
+    Replace the settings, forgetting everything loaded so far. Settings that are not given are read from files on
+    first use, as usual.
+
+    Args:
+        config (dict): Content of the config file, instead of reading it.
+        config_file (str): Path of the config file to read instead of config.json.
+        authors (dict): Slack usernames by GitHub username, by authors file path, instead of reading the files.
+        tokens (dict): Tokens by service ("github" or "jira"), instead of reading the token files.
+        token_files (dict): Token file paths by service, overriding the ones of the config.
+    """
+    global _config_file, _config
+    with _lock:
+        _config_file = config_file or CONFIG_FILE
+        _config = _validate_config(config) if config is not None else None
+        _authors.clear()
+        _authors.update(authors or {})
+        _tokens.clear()
+        _tokens.update(tokens or {})
+        _token_files.clear()
+        _token_files.update(token_files or {})
+
+
+def set_token_file(service, file_path):
+    """Read the token of a service ("github" or "jira") from `file_path` instead of the token file of the config."""
+    with _lock:
+        _token_files[service] = file_path
+        _tokens.pop(service, None)
+
+
+def _validate_config(config):
+    github = config.get("github") if isinstance(config, dict) else None
+    if not isinstance(github, dict):
+        raise SettingsError("The config has no 'github' section.")
+    if not github.get("repos") and not (github.get("org") and github.get("repo")):
+        raise SettingsError("The config has neither github.repos nor github.org and github.repo.")
+    if not config.get("teams") and not config.get("authors_file"):
+        raise SettingsError("The config has neither teams nor authors_file.")
+    for team in config.get("teams") or []:
+        if not team.get("authors_file"):
+            raise SettingsError(f"Team {team.get('name', '')!r} has no authors_file.")
+    return config
+
+
+def get_config():
+    """Return the content of the config file, read and validated on first use."""
+    global _config
+    if _config is not None:
+        return _config
+    with _lock:
+        if _config is None:
+            try:
+                with open(_config_file, "r") as file:
+                    config = json.load(file)
+            except FileNotFoundError:
+                raise SettingsError(f"Config file '{_config_file}' not found.")
+            except Exception as e:
+                raise SettingsError(f"Unable to read the config file. Details: {e}")
+            _config = _validate_config(config)
+        return _config
+
+
+def get_repos():
+    """Return the (org, repo) tuples of the repositories, from "org/repo" names in github.repos, or the single
+    github.org and github.repo."""
+    github = get_config()["github"]
+    return [tuple(name.split("/", 1)) for name in github.get("repos", [])] or [(github["org"], github["repo"])]
+
+
+def get_teams():
+    """Return the teams of the config, each with its own authors file. The single top level authors_file is one
+    team."""
+    config = get_config()
+    return config.get("teams") or [{"name": "default", "authors_file": config["authors_file"]}]
+
+
+def load_authors(file_path):
+    """Return the Slack usernames by lowercase GitHub username of an authors file (`github_user:slack_user` lines)."""
+    with _lock:
+        if file_path not in _authors:
+            try:
+                with open(file_path, "r") as file:
+                    slack_users_by_gh_users_dict = {}
+                    for line in file.readlines():
+                        gh_user, slack_user = line.strip().split(":")
+                        gh_user = gh_user.lower()
+                        slack_users_by_gh_users_dict[gh_user] = slack_user
+            except FileNotFoundError:
+                raise SettingsError(
+                    f"Authors file '{file_path}' not found. Please create the file with your desired authors.")
+            except Exception as e:
+                raise SettingsError(f"Unable to read the authors file. Details: {e}")
+            _authors[file_path] = slack_users_by_gh_users_dict
+        return _authors[file_path]
+
+
+def load_teams():
+    """
+    Load the authors file of every team of the config.
+
+    Returns:
+        list: (name, slack_users_by_gh_users_dict) tuples, one per team.
+    """
+    return [(team.get("name", team["authors_file"]), load_authors(team["authors_file"])) for team in get_teams()]
+
+
+def get_token(service):
+    """Return the token of a service ("github" or "jira"), read from its token file on first use."""
+    token = _tokens.get(service)
+    if token is not None:
+        return token
+    with _lock:
+        if service not in _tokens:
+            file_path = _token_files.get(service)
+            if not file_path:
+                file_path = (get_config().get(service) or {}).get("token_file")
+            if not file_path:
+                raise SettingsError(f"The config has no {service}.token_file.")
+            try:
+                with open(file_path, "r") as file:
+                    _tokens[service] = file.read().strip()
+            except FileNotFoundError:
+                raise SettingsError(
+                    f"Token file '{file_path}' not found. Please create the file with your "
+                    f"{_SERVICE_NAMES.get(service, service)} token.")
+            except Exception as e:
+                raise SettingsError(f"Unable to read the token file. Details: {e}")
+        return _tokens[service]
+
+
+def get_jira():
+    """Return the JIRA settings, validated and with the token loaded on first use."""
+    jira = get_config().get("jira") or {}
+    missing = [key for key in ("base_url", "email", "ticket_number_regex") if not jira.get(key)]
+    if missing:
+        raise SettingsError(f"The config has no {', '.join(f'jira.{key}' for key in missing)}.")
+    return JiraSettings(jira["base_url"], jira["email"], get_token("jira"), jira["ticket_number_regex"])
@@ -0,0 +1,125 @@
+import contextlib
+import json
+import re
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Spans are only recorded once enabled, e.g. by the --trace option
+ENABLED = False
+
+_spans = []
+_spans_lock = threading.Lock()
+_started = time.perf_counter()
+
+# Path segments that identify a single resource, folded so calls to the same endpoint are grouped together
+_ENDPOINT_PATTERNS = (
+    (re.compile(r"/[A-Z][A-Z0-9]*-\d+(?=/|$)"), "/{key}"),
+    (re.compile(r"/[0-9a-f]{40}(?=/|$)"), "/{sha}"),
+    # Not the version of versioned APIs, as in JIRA's /rest/api/3
+    (re.compile(r"(?<!/api)/\d+(?=/|$)"), "/{number}"),
+)
+
+
+def enable():
+    """Start recording spans, forgetting the ones recorded so far."""
+    global ENABLED, _started
+    with _spans_lock:
+        _spans.clear()
+        _started = time.perf_counter()
+    ENABLED = True
+
+
+def get_endpoint(method, url):
+    """Return the endpoint of a request, its host and path with PR numbers, ticket keys and SHAs folded."""
+    parts = urlsplit(url)
+    path = parts.path
+    for pattern, replacement in _ENDPOINT_PATTERNS:
+        path = pattern.sub(replacement, path)
+    return f"{method} {parts.netloc}{path}"
+
+
+def add_span(name, category, started, duration, **args):
+    """
+    Record a span that was timed by the caller.
+
+    Args:
+        name (str): What the span is about, e.g. the endpoint of an HTTP call.
+        category (str): Kind of span ('http', 'pr', 'jira'...), spans are summarized by category.
+        started (float): time.perf_counter() value when the span started.
+        duration (float): Duration of the span in seconds.
+        **args: Details of the span (status, bytes...).
+    """
+    if not ENABLED:
+        return
+    span = {"name": name, "cat": category, "ts": (started - _started) * 1e6, "dur": duration * 1e6,
+            "tid": threading.get_ident(), "args": args}
+    with _spans_lock:
+        _spans.append(span)
+
+
+@contextlib.contextmanager
+def span(name, category, **args):
+    """
+    Record the time spent in a block as a span. The block can add details to the span through the yielded dict.
+
+    Usage:
+        with trace.span("PR #123", "pr", repo="org/repo") as details:
+            details["reviews"] = len(reviews)
+    """
+    if not ENABLED:
+        yield {}
+        return
+    started = time.perf_counter()
+    try:
+        yield args
+    finally:
+        add_span(name, category, started, time.perf_counter() - started, **args)
+
+
+def get_spans():
+    with _spans_lock:
+        return list(_spans)
+
+
+def write(path):
+    """
+    Write the recorded spans to `path`: as JSON lines, one span per line, when it ends with '.jsonl', and in the
+    Chrome trace event format (loadable in chrome://tracing or https://ui.perfetto.dev) otherwise.
+    """
+    spans = get_spans()
+    with open(path, "w") as file:
+        if path.endswith(".jsonl"):
+            for span in spans:
+                file.write(json.dumps(span) + "\n")
+        else:
+            events = [dict(span, ph="X", pid=1) for span in spans]
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+
+def print_summary(file=None, limit=10):
+    """Print, to stderr by default, the slowest PRs and the endpoints the most time was spent on."""
+    file = file or sys.stderr
+    spans = get_spans()
+    prs = sorted((span for span in spans if span["cat"] == "pr"), key=lambda span: span["dur"], reverse=True)
+    if prs:
+        print("\nSlowest PRs:", file=file)
+        print(f"{'ms':>9}  PR", file=file)
+        for span in prs[:limit]:
+            print(f"{span['dur'] / 1000:>9.0f}  {span['name']}", file=file)
+    endpoints = {}
+    for span in spans:
+        if span["cat"] == "http":
+            stats = endpoints.setdefault(span["name"], {"calls": 0, "total": 0, "max": 0, "bytes": 0})
+            stats["calls"] += 1
+            stats["total"] += span["dur"]
+            stats["max"] = max(stats["max"], span["dur"])
+            stats["bytes"] += span["args"].get("bytes", 0)
+    if endpoints:
+        print("\nSlowest endpoints:", file=file)
+        print(f"{'calls':>6} {'total ms':>9} {'max ms':>7} {'KB':>7}  endpoint", file=file)
+        by_total = sorted(endpoints.items(), key=lambda item: item[1]["total"], reverse=True)
+        for endpoint, stats in by_total[:limit]:
+            print(f"{stats['calls']:>6} {stats['total'] / 1000:>9.0f} {stats['max'] / 1000:>7.0f} "
+                  f"{stats['bytes'] // 1024:>7}  {endpoint}", file=file)
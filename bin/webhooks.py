@@ -0,0 +1,152 @@
+#!./.venv/bin/python
+import hashlib
+import hmac
+import json
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from bin import client
+
+# Global debug flag
+DEBUG_MODE = False
+
+# Header carrying the shared secret of JIRA deliveries, which can also pass it as the `token` query parameter
+JIRA_TOKEN_HEADER = "X-Webhook-Token"
+
+
+def debug_print(*args, **kwargs):
+    """Print debug information only when debug mode is enabled."""
+    if DEBUG_MODE:
+        print("DEBUG:", *args, **kwargs)
+
+
+def sign_payload(secret, body):
+    """Return the X-Hub-Signature-256 header value GitHub sends for a body signed with the webhook secret."""
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def _record_event(record_dir, source, event, payload):
+    os.makedirs(record_dir, exist_ok=True)
+    file_name = f"{time.time_ns()}-{source}-{event}.json"
+    with open(os.path.join(record_dir, file_name), "w") as file:
+        json.dump({"source": source, "event": event, "payload": payload}, file)
+
+
+def create_server(host, port, handle_event, secret=None, jira_secret=None, record_dir=None):
+    """
+    Create an HTTP server receiving GitHub webhooks on /github and JIRA webhooks on /jira.
+
+    Deliveries are acknowledged right away and handed, one at a time and in order of arrival, to
+    `handle_event(source, event, payload)` on a background thread, so the handler never runs concurrently with itself.
+
+    Args:
+        host (str): Address to listen on.
+        port (int): Port to listen on.
+        handle_event (callable): Called with 'github' or 'jira', the event name (the X-GitHub-Event header, or the
+            'webhookEvent' field for JIRA) and the decoded payload.
+        secret (str): GitHub webhook secret. When set, GitHub deliveries without a valid signature are rejected.
+        jira_secret (str): Shared secret of the JIRA webhooks. When set, JIRA deliveries that do not pass it in the
+            `token` query parameter or the X-Webhook-Token header are rejected.
+        record_dir (str): When set, every accepted delivery is also saved there, in the format
+            post_recorded_payloads replays.
+
+    Returns:
+        ThreadingHTTPServer: The server; call serve_forever() on it.
+    """
+    events = queue.Queue()
+
+    def process_events():
+        while True:
+            source, event, payload = events.get()
+            try:
+                handle_event(source, event, payload)
+            except Exception as e:
+                print(f"Error handling {source} '{event}' event: {e}")
+
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            debug_print(format % args)
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            source = url.path.strip("/")
+            if source not in ("github", "jira"):
+                self.send_error(404)
+                return
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if source == "github" and secret and not hmac.compare_digest(
+                    sign_payload(secret, body), self.headers.get("X-Hub-Signature-256", "")):
+                self.send_error(401, "Invalid signature")
+                return
+            if source == "jira" and jira_secret:
+                token = self.headers.get(JIRA_TOKEN_HEADER) or parse_qs(url.query).get("token", [""])[0]
+                if not hmac.compare_digest(jira_secret.encode(), token.encode()):
+                    self.send_error(401, "Invalid token")
+                    return
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                self.send_error(400, "Invalid JSON payload")
+                return
+            if source == "github":
+                event = self.headers.get("X-GitHub-Event", "")
+            else:
+                event = payload.get("webhookEvent", "")
+            if record_dir:
+                _record_event(record_dir, source, event, payload)
+            events.put((source, event, payload))
+            self.send_response(202)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    server = ThreadingHTTPServer((host, port), WebhookHandler)
+    threading.Thread(target=process_events, daemon=True).start()
+    return server
+
+
+def post_recorded_payloads(base_url, paths, secret=None, jira_secret=None):
+    """
+    Post recorded webhook deliveries to a server created by create_server, standing in for GitHub and JIRA.
+
+    Args:
+        base_url (str): URL of the server (e.g., 'http://localhost:8080').
+        paths (list): Recorded delivery files, JSON objects with 'source', 'event' and 'payload' keys. They are
+            posted in the given order.
+        secret (str): GitHub webhook secret used to sign GitHub deliveries.
+        jira_secret (str): Shared secret sent with JIRA deliveries.
+    """
+    session = client.get_session(base_url, headers={"Content-Type": "application/json"})
+    for path in paths:
+        with open(path, "r") as file:
+            delivery = json.load(file)
+        body = json.dumps(delivery["payload"]).encode()
+        headers = {}
+        if delivery["source"] == "github":
+            headers["X-GitHub-Event"] = delivery["event"]
+            if secret:
+                headers["X-Hub-Signature-256"] = sign_payload(secret, body)
+        elif jira_secret:
+            headers[JIRA_TOKEN_HEADER] = jira_secret
+        response = client.request(session, "POST", f"{base_url}/{delivery['source']}", data=body, headers=headers)
+        response.raise_for_status()
+        print(f"Posted {path} -> {response.status_code}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Post recorded GitHub and JIRA webhook deliveries to a server.")
+    parser.add_argument("url", help="URL of the server (e.g., http://localhost:8080).")
+    parser.add_argument("payloads", nargs="+", help="Recorded delivery files, posted in order.")
+    parser.add_argument("--secret", type=str, default=None, help="GitHub webhook secret used to sign deliveries.")
+    parser.add_argument("--jira-secret", type=str, default=None, help="Shared secret sent with JIRA deliveries.")
+    args = parser.parse_args()
+    post_recorded_payloads(args.url.rstrip("/"), args.payloads, args.secret, args.jira_secret)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,95 +1,243 @@
 #!./.venv/bin/python
-import json
-
-from bin.gh.prs import get_merged_prs_last_x_days, get_pr_approvers_and_past_reviewers
-
-
-def load_config(config_file="config.json"):
-    try:
-        with open(config_file, "r") as file:
-            return json.load(file)
-    except FileNotFoundError:
-        print(f"Error: Config file '{config_file}' not found.")
-        exit(1)
-    except Exception as e:
-        print(f"Error: Unable to read the config file. Details: {e}")
-        exit(1)
-
-
-CONFIG = load_config()
-AUTHORS_FILE = CONFIG["authors_file"]
-ORG = CONFIG["github"]["org"]
-REPO = CONFIG["github"]["repo"]
-GH_TOKEN_FILE = CONFIG["github"]["token_file"]
-
-
-def load_authors(file_path):
-    try:
-        with open(file_path, "r") as file:
-            slack_users_by_gh_users_dict = {}
-            for line in file.readlines():
-                gh_user, slack_user = line.strip().split(":")
-                gh_user = gh_user.lower()
-                slack_users_by_gh_users_dict[gh_user] = slack_user
-            return slack_users_by_gh_users_dict
-    except FileNotFoundError:
-        print(f"Error: Authors file '{file_path}' not found. Please create the file with your desired authors.")
-        exit(1)
-    except Exception as e:
-        print(f"Error: Unable to read the authors file. Details: {e}")
-        exit(1)
-
-
-def load_token(file_path):
-    try:
-        with open(file_path, "r") as file:
-            return file.read().strip()
-    except FileNotFoundError:
-        print(f"Error: Token file '{file_path}' not found. Please create the file with your GitHub token.")
-        exit(1)
-    except Exception as e:
-        print(f"Error: Unable to read the token file. Details: {e}")
-        exit(1)
-
-
-def generate_pr_approval_stats(last_days, slack_users_by_gh_users_dict, gh_token):
-    merged_prs = get_merged_prs_last_x_days(ORG, REPO, gh_token, last_days)
-    approval_counts = {}
-    our_merged_prs_count = 0
-    for pr in merged_prs:
-        # Check if PR author is in the authors list
-        pr_author = pr['user']['login'].lower()
-        if pr_author not in slack_users_by_gh_users_dict:
+import itertools
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+
+from bin import client, settings, trace
+from bin.fixtures import Recorder, Replayer
+from bin.gh import prs
+from bin.gh.cache import ResponseCache
+from bin.gh.prs import (get_merged_prs_since, get_pr_approvals, get_pr_review_events, search_merged_prs_since,
+                        clear_memo)
+from bin.gh.store import MergedPRStore, DEFAULT_STORE_FILE
+from bin.metrics import PERCENTILES, ReviewColumns, compute_windows, percentile
+
+# Number of PRs whose approvals are fetched in parallel by default
+DEFAULT_WORKERS = 8
+
+
+def sync_merged_prs(store, since, gh_token, use_search=False, repos=None):
+    """
+    Store every PR merged after `since` in each of `repos` (all the configured repositories by default), fetching
+    only the ones merged after the last sync. Repositories are fetched concurrently.
+    """
+    repos = repos or settings.get_repos()
+    now = datetime.now(timezone.utc)
+    synced_ranges = [store.get_synced_range(f"{org}/{repo}") for org, repo in repos]
+    get_merged_prs = search_merged_prs_since if use_search else get_merged_prs_since
+
+    def fetch(org, repo, synced_range):
+        if synced_range and synced_range[0] <= since:
+            fetch_since = synced_range[1]
+        else:
+            fetch_since = since
+        return list(get_merged_prs(org, repo, gh_token, fetch_since))
+
+    with ThreadPoolExecutor(max_workers=len(repos)) as executor:
+        merged_prs = list(executor.map(lambda args: fetch(*args[0], args[1]), zip(repos, synced_ranges)))
+    # SQLite connections can only be used from the thread that opened them, store from this one
+    for (org, repo), synced_range, repo_prs in zip(repos, synced_ranges, merged_prs):
+        for pr in repo_prs:
+            store.add_pr(f"{org}/{repo}", pr.number, pr.author, pr.merged_at)
+        store.set_synced_range(f"{org}/{repo}", min(since, synced_range[0]) if synced_range else since, now)
+
+
+def _fetch_approvals(prs, gh_token, workers, review_events=False):
+    """
+    Fetch the approvals of every (repo_name, pr_number) of `prs` with `workers` threads.
+
+    Results are yielded as soon as each fetch completes, as (repo_name, pr_number, approvers) tuples, approvers
+    being the exception raised when the fetch failed. At most twice `workers` fetches are queued at any time, so
+    memory does not grow with the number of PRs.
+
+    With `review_events`, the ReviewEvent records of each PR are fetched and yielded instead of its approvers.
+    """
+    def fetch(repo_name, pr_number):
+        org, repo = repo_name.split("/", 1)
+        with trace.span(f"{repo_name}#{pr_number}", "pr"):
+            try:
+                if review_events:
+                    return get_pr_review_events(org, repo, pr_number, gh_token)
+                return [review.login for review in get_pr_approvals(org, repo, pr_number, gh_token)]
+            except Exception as e:
+                return e
+            finally:
+                clear_memo(org, repo, pr_number)
+
+    prs = iter(prs)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(fetch, *pr): pr for pr in itertools.islice(prs, workers * 2)}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                repo_name, pr_number = pending.pop(future)
+                for pr in itertools.islice(prs, 1):
+                    pending[executor.submit(fetch, *pr)] = pr
+                yield repo_name, pr_number, future.result()
+
+
+def _format_duration(seconds):
+    if seconds is None:
+        return "-"
+    hours = seconds / 3600
+    return f"{hours:.1f}h" if hours < 48 else f"{hours / 24:.1f}d"
+
+
+def print_review_metrics(metrics, slack_users_by_gh_users_dict):
+    """Print the review metrics of a team, one table per window, followed by its author × reviewer matrix."""
+    def name(login):
+        return f"@{slack_users_by_gh_users_dict.get(login, login)}"
+
+    percentiles = "/".join(f"p{percent}" for percent in PERCENTILES)
+    for window in metrics:
+        print(f"\nReview metrics (Last {window.days} Days): {window.merged_prs} merged "
+              f"PR{'s' if window.merged_prs != 1 else ''}")
+        reviewers = sorted(window.reviews, key=lambda login: (-window.approvals.get(login, 0), login))
+        if not reviewers:
+            continue
+        width = max(len(name(login)) for login in reviewers)
+        print(f"{'':<{width}}  {'approvals':>9}  {'reviewed':>8}  {'first review ' + percentiles:>22}  "
+              f"{'approval ' + percentiles:>18}")
+        for login in reviewers:
+            first_review = " / ".join(_format_duration(percentile(window.time_to_first_review.get(login), percent))
+                                      for percent in PERCENTILES)
+            approval = " / ".join(_format_duration(percentile(window.time_to_approve.get(login), percent))
+                                  for percent in PERCENTILES)
+            print(f"{name(login):<{width}}  {window.approvals.get(login, 0):>9}  {window.reviews[login]:>8}  "
+                  f"{first_review:>22}  {approval:>18}")
+        authors = sorted({author for author, _ in window.matrix})
+        column_width = max(len(name(login)) for login in reviewers + authors)
+        print("\nPRs reviewed, by author (rows) and reviewer (columns):")
+        print(" " * column_width + "".join(f"  {name(login):>{column_width}}" for login in reviewers))
+        for author in authors:
+            print(f"{name(author):<{column_width}}" + "".join(
+                f"  {window.matrix.get((author, login), '-'):>{column_width}}" for login in reviewers))
+
+
+def generate_pr_approval_stats(last_days, teams, gh_token, store, use_search=False, workers=DEFAULT_WORKERS,
+                               windows=None):
+    """
+    Print the approval statistics of each team, over the PRs its members merged in every configured repository.
+
+    Args:
+        last_days (int): Number of days to look back for merged PRs.
+        teams (list): (name, slack_users_by_gh_users_dict) tuples, one per team.
+        gh_token (str): Your GitHub personal access token.
+        store (MergedPRStore): Store of the merged PRs and their approvals.
+        use_search (bool): Find merged PRs through the Search API instead of listing closed PRs.
+        workers (int): Number of PRs whose approvals are fetched in parallel.
+        windows (list): Lengths in days of the windows to also print the review metrics of, e.g. [7, 30, 90]. The
+            review events they are computed from are fetched and stored along with the approvals.
+    """
+    now = datetime.now(timezone.utc)
+    since = now - timedelta(days=int(last_days))
+    windows_since = now - timedelta(days=max(windows)) if windows else since
+    sync_merged_prs(store, min(since, windows_since), gh_token, use_search)
+    authors = {user for _, slack_users_by_gh_users_dict in teams for user in slack_users_by_gh_users_dict}
+    if windows:
+        missing_events = store.get_prs_missing_review_events(windows_since, authors)
+        for repo_name, pr_number, review_events in _fetch_approvals(missing_events, gh_token, workers, True):
+            if isinstance(review_events, Exception):
+                print(f"Error fetching the reviews of {repo_name}#{pr_number}: {review_events}")
+                continue
+            store.set_review_events(repo_name, pr_number, review_events)
+    missing_approvals = store.get_prs_missing_approvals(since, authors)
+    # SQLite connections can only be used from the thread that opened them, approvals are stored from this one as
+    # they arrive
+    for repo_name, pr_number, approvers in _fetch_approvals(missing_approvals, gh_token, workers):
+        if isinstance(approvers, Exception):
+            # Left missing, so the next run fetches them again
+            print(f"Error fetching the approvals of {repo_name}#{pr_number}: {approvers}")
             continue
-        our_merged_prs_count += 1
-        pr_number = pr['number']
-        approvals, _, _, _ = get_pr_approvers_and_past_reviewers(ORG, REPO, pr_number, gh_token)
-        approvals = [t[0] for t in approvals]
-        for approver in approvals:
-            if approver in slack_users_by_gh_users_dict:
-                approval_counts[approver] = approval_counts.get(approver, 0) + 1
+        store.set_approvals(repo_name, pr_number, approvers)
 
     print(f"\nPR Approval Statistics (Last {last_days} Days):")
-    print(f"\nMerged PRs: {our_merged_prs_count}")
-    for approver, count in sorted(approval_counts.items(), key=lambda x: x[1], reverse=True):
-        print(f"@{slack_users_by_gh_users_dict[approver]} has approved {count} merged PR{'s' if count != 1 else ''}")
+    for team_name, slack_users_by_gh_users_dict in teams:
+        our_merged_prs_count, approval_counts = store.get_approval_stats(since, slack_users_by_gh_users_dict)
+        if len(teams) > 1:
+            print(f"\nTeam: {team_name}")
+        print(f"\nMerged PRs: {our_merged_prs_count}")
+        for approver, count in sorted(approval_counts.items(), key=lambda x: x[1], reverse=True):
+            print(f"@{slack_users_by_gh_users_dict[approver]} has approved {count} merged "
+                  f"PR{'s' if count != 1 else ''}")
+
+    if windows:
+        # Loaded once for every team, each team's windows are then computed in one pass over the columns
+        columns = ReviewColumns.from_store(store.get_merged_prs(windows_since, authors),
+                                           store.get_review_events(windows_since, authors))
+        for team_name, slack_users_by_gh_users_dict in teams:
+            if len(teams) > 1:
+                print(f"\nTeam: {team_name}")
+            print_review_metrics(compute_windows(columns, windows, now.timestamp(), slack_users_by_gh_users_dict),
+                                 slack_users_by_gh_users_dict)
 
 
 def main():
     import argparse
-    global AUTHORS_FILE, GH_TOKEN_FILE
     parser = argparse.ArgumentParser(description="Generate PR approval statistics.")
     parser.add_argument("--last_days", type=int, default=30, help="Number of days to look back for merged PRs.")
-    parser.add_argument("--authors_file", type=str, default=AUTHORS_FILE, help="Path to the authors file.")
-    parser.add_argument("--gh_token_file", type=str, default=GH_TOKEN_FILE, help="Path to the GitHub token file.")
+    parser.add_argument("--authors_file", type=str, default=None,
+                        help="Path to the authors file, reporting on that single team instead of the configured ones.")
+    parser.add_argument("--gh_token_file", type=str, default=None,
+                        help="Path to the GitHub token file, instead of the one of the config.")
+    parser.add_argument("--no_cache", "--no-cache", action="store_true",
+                        help="Do not use the on-disk GitHub response cache.")
+    parser.add_argument("--store_file", type=str, default=DEFAULT_STORE_FILE,
+                        help="Path to the local store of merged PRs and their approvals.")
+    parser.add_argument("--search", action="store_true",
+                        help="Find merged PRs through the Search API instead of listing closed PRs.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Number of PRs whose approvals are fetched in parallel.")
+    parser.add_argument("--windows", type=str, default=None,
+                        help="Comma separated lengths in days of windows to also print review metrics for, "
+                             "e.g. 7,30,90.")
+    parser.add_argument("--record_http", "--record-http", type=str, default=None,
+                        help="Record every GitHub request and response to this file.")
+    parser.add_argument("--replay_http", "--replay-http", type=str, default=None,
+                        help="Answer GitHub requests from a file written by --record_http, offline.")
+    parser.add_argument("--trace", type=str, default=None,
+                        help="Write a trace of every PR and HTTP call to this file (JSON lines if it ends with .jsonl, "
+                             "Chrome trace format otherwise) and print the slowest PRs and endpoints.")
     args = parser.parse_args()
-    AUTHORS_FILE = args.authors_file
-    GH_TOKEN_FILE = args.gh_token_file
+    if args.gh_token_file:
+        settings.set_token_file("github", args.gh_token_file)
+    try:
+        gh_token = settings.get_token("github")
+        if args.authors_file:
+            teams = [("default", settings.load_authors(args.authors_file))]
+        else:
+            teams = settings.load_teams()
+    except settings.SettingsError as e:
+        print(f"Error: {e}")
+        exit(1)
     last_days = args.last_days
+    windows = None
+    if args.windows:
+        try:
+            windows = sorted({int(days) for days in args.windows.split(",") if days.strip()})
+        except ValueError:
+            print(f"Error: --windows must be comma separated numbers of days, not '{args.windows}'.")
+            exit(1)
+    client.configure(pool_size=max(client.POOL_SIZE, args.workers))
+    if args.record_http:
+        client.set_transport(Recorder(args.record_http).adapter)
+    elif args.replay_http:
+        client.set_transport(Replayer(args.replay_http).adapter)
+    if args.trace:
+        trace.enable()
+    if not args.no_cache:
+        prs.CACHE = ResponseCache()
     print(f"Looking back {last_days} days for merged PRs.")
-    gh_token = load_token(GH_TOKEN_FILE)
-    slack_users_by_gh_users_dict = load_authors(AUTHORS_FILE)
-    generate_pr_approval_stats(last_days, slack_users_by_gh_users_dict, gh_token)
+    store = MergedPRStore(args.store_file)
+    generate_pr_approval_stats(last_days, teams, gh_token, store, args.search, max(1, args.workers), windows)
+    store.close()
+    client.print_summary()
+    if args.trace:
+        trace.print_summary()
+        trace.write(args.trace)
+    client.close()
+    if prs.CACHE:
+        prs.CACHE.close()
 
 
 if __name__ == "__main__":
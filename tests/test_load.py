@@ -0,0 +1,59 @@
+import random
+import threading
+
+from bin.load import ReviewerLoad
+
+USERS = ["alice", "bob", "carol", "dave"]
+
+
+def test_pick_excludes_the_author_and_prefers_the_least_loaded(tmp_path):
+    load = ReviewerLoad("run", 0, 1, path=tmp_path / "load.sqlite", rng=random.Random(1))
+    load.add("alice")
+    load.add("bob")
+
+    assert load.pick(exclude="carol", users=USERS) == "dave"
+    assert load.pick(exclude="alice", users=["alice"]) is None
+    load.close()
+
+
+def test_wait_for_shards(tmp_path):
+    path = tmp_path / "load.sqlite"
+    first = ReviewerLoad("run", 0, 2, path=path)
+    second = ReviewerLoad("run", 1, 2, path=path)
+    first.mark_counted()
+    assert not first.wait_for_shards(timeout=0)
+
+    second.mark_counted()
+    assert first.wait_for_shards(timeout=0)
+    first.close()
+    second.close()
+
+
+def test_concurrent_picks_stay_balanced(tmp_path):
+    path = tmp_path / "load.sqlite"
+    # Each shard starts from the reviewers already on its PRs, unbalanced on their own
+    counted = [["alice"], ["alice", "bob"]]
+    picks = [[], []]
+
+    def run_shard(index):
+        shard = ReviewerLoad("run", index, 2, path=path, rng=random.Random(index))
+        for user in counted[index]:
+            shard.add(user)
+        shard.mark_counted()
+        if shard.wait_for_shards(timeout=10):
+            for _ in range(25):
+                picks[index].append(shard.pick(users=USERS))
+        shard.close()
+
+    threads = [threading.Thread(target=run_shard, args=(index,)) for index in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    load = ReviewerLoad("run", 0, 2, path=path)
+    loads = load.get_loads()
+    load.close()
+    assert len(picks[0]) == len(picks[1]) == 25
+    assert sum(loads.values()) == 3 + 50
+    assert max(loads.values()) - min(loads.get(user, 0) for user in USERS) <= 1
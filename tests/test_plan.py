@@ -0,0 +1,73 @@
+import pytest
+
+from bin import plan
+from bin.plan import ASSIGN, TRANSITION, Action, apply_plan, deduplicate
+
+PR_1 = ("org", "repo", 1)
+PR_2 = ("org", "repo", 2)
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(plan, "RETRY_DELAY", 0)
+
+
+def test_deduplicate_keeps_the_first_action_of_each_effect():
+    first = Action(TRANSITION, PR_1, ticket="PROJ-1", target="qa review")
+    same_ticket = Action(TRANSITION, PR_2, ticket="PROJ-1", target="qa review")
+    assign = Action(ASSIGN, PR_1, reviewer="alice")
+    other_pr = Action(ASSIGN, PR_2, reviewer="alice")
+
+    assert deduplicate([first, assign, same_ticket, assign, other_pr]) == [first, assign, other_pr]
+
+
+def test_apply_plan_applies_duplicates_once():
+    applied = []
+
+    def apply(actions):
+        applied.extend(actions)
+        return {}
+
+    action = Action(ASSIGN, PR_1, reviewer="alice")
+    assert apply_plan([action, action], {ASSIGN: apply}) == {}
+    assert applied == [action]
+
+
+def test_apply_plan_retries_failed_actions():
+    attempts = []
+    action = Action(ASSIGN, PR_1, reviewer="alice")
+
+    def apply(actions):
+        attempts.append(list(actions))
+        return {action: RuntimeError("timeout")} if len(attempts) == 1 else {}
+
+    assert apply_plan([action], {ASSIGN: apply}, checks={ASSIGN: lambda a: False}) == {}
+    assert attempts == [[action], [action]]
+
+
+def test_apply_plan_does_not_retry_actions_the_check_finds_applied():
+    attempts = []
+    applied = Action(ASSIGN, PR_1, reviewer="alice")
+    failed = Action(ASSIGN, PR_2, reviewer="bob")
+
+    def apply(actions):
+        attempts.append(list(actions))
+        return {action: RuntimeError("timeout") for action in actions}
+
+    errors = apply_plan([applied, failed], {ASSIGN: apply}, checks={ASSIGN: lambda action: action == applied},
+                        retries=2)
+    assert attempts == [[applied, failed], [failed], [failed]]
+    assert list(errors) == [failed]
+
+
+def test_apply_plan_returns_the_errors_left_after_the_last_retry():
+    error = RuntimeError("refused")
+    action = Action(TRANSITION, PR_1, ticket="PROJ-1", target="in progress")
+
+    def apply(actions):
+        return {action: error for action in actions}
+
+    def failing_check(action):
+        raise RuntimeError("unreachable")
+
+    assert apply_plan([action], {TRANSITION: apply}, checks={TRANSITION: failing_check}, retries=1) == {action: error}
@@ -0,0 +1,56 @@
+import json
+
+from bin.runs import Checkpoint
+
+KEYS = [Checkpoint.key("org", "repo", number) for number in (1, 2, 3)]
+
+
+def test_key():
+    assert Checkpoint.key("org", "repo", 12) == "org/repo#12"
+
+
+def test_start_returns_the_prs_processed_in_the_cycle(tmp_path):
+    checkpoint = Checkpoint(tmp_path / "checkpoint.json")
+    assert checkpoint.start(KEYS) == {}
+    checkpoint.add({KEYS[0]: "alice", KEYS[1]: None})
+
+    resumed = Checkpoint(tmp_path / "checkpoint.json")
+    assert resumed.start(KEYS) == {KEYS[0]: "alice", KEYS[1]: None}
+
+
+def test_start_begins_a_new_cycle_once_every_pr_was_processed(tmp_path):
+    path = tmp_path / "checkpoint.json"
+    checkpoint = Checkpoint(path)
+    checkpoint.start(KEYS)
+    checkpoint.add({KEYS[0]: "alice", KEYS[1]: "bob"})
+    checkpoint.add({KEYS[2]: None})
+
+    rolled_over = Checkpoint(path)
+    assert rolled_over.start(KEYS) == {}
+    rolled_over.add({KEYS[0]: "carol"})
+    assert json.loads(path.read_text()) == {"prs": {KEYS[0]: "carol"}}
+
+
+def test_closed_prs_do_not_hold_the_cycle_open(tmp_path):
+    path = tmp_path / "checkpoint.json"
+    checkpoint = Checkpoint(path)
+    checkpoint.start(KEYS)
+    checkpoint.add({KEYS[0]: "alice", KEYS[1]: "bob"})
+
+    # PR 3 was closed, the two PRs left open were both processed
+    assert Checkpoint(path).start(KEYS[:2]) == {}
+
+
+def test_unreadable_checkpoint_is_ignored(tmp_path, capsys):
+    path = tmp_path / "checkpoint.json"
+    path.write_text("{not json")
+
+    assert Checkpoint(path).start(KEYS) == {}
+    assert "Ignoring the unreadable checkpoint" in capsys.readouterr().out
+
+
+def test_add_leaves_no_temporary_file(tmp_path):
+    path = tmp_path / "checkpoint.json"
+    Checkpoint(path).add({KEYS[0]: "alice"})
+
+    assert [file.name for file in tmp_path.iterdir()] == ["checkpoint.json"]